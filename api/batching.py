@@ -0,0 +1,124 @@
+import asyncio
+import logging
+from concurrent.futures import Executor
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class PredictionBatcher:
+    """
+    Coalesces concurrent /predict requests into a single model call.
+
+    Requests are queued and a background task drains up to `max_batch_size`
+    of them, waiting at most `max_wait_ms` after the first one arrives.
+    The whole batch is handed to `score_fn`, which returns one result per row.
+    `score_fn` runs in `executor` (the loop's default executor if None), so the
+    event loop keeps collecting the next batch while a batch is being scored.
+    """
+
+    def __init__(self, score_fn: Callable[[list[dict]], list[dict]],
+                 max_batch_size: int = 64, max_wait_ms: float = 2.0,
+                 executor: Executor | None = None):
+        self.score_fn = score_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.executor = executor
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._in_flight: set[asyncio.Task] = set()
+        # Requests taken off the queue by _collect() but not yet handed to _score()
+        self._collecting: list[tuple[dict, asyncio.Future]] = []
+
+    def start(self):
+        """Start the background worker on the running event loop."""
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Prediction batcher started (max_batch_size={self.max_batch_size}, "
+                    f"max_wait_ms={self.max_wait * 1000:g}).")
+
+    def is_running(self) -> bool:
+        """True when the worker is alive on the caller's event loop."""
+        try:
+            return self._task is not None and self._loop is asyncio.get_running_loop()
+        except RuntimeError:
+            return False
+
+    async def stop(self):
+        """
+        Cancel the worker, let batches already being scored finish, and fail
+        any requests still waiting in the queue.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._loop = None
+
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+
+        # The worker may have been cancelled halfway through collecting a batch
+        pending = self._collecting
+        self._collecting = []
+        while self._queue is not None and not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        for _, future in pending:
+            if not future.done():
+                future.set_exception(RuntimeError("Prediction batcher stopped"))
+
+    async def submit(self, row: dict) -> Any:
+        """Queue a single row and wait for its result."""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((row, future))
+        return await future
+
+    async def _collect(self) -> list[tuple[dict, asyncio.Future]]:
+        # Block until at least one request is available, then keep draining
+        # until the batch is full or the wait window has elapsed.
+        # The batch lives on self so stop() can fail it if we're cancelled here.
+        batch = self._collecting = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            self._collecting = []
+            task = asyncio.create_task(self._score(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _score(self, batch: list[tuple[dict, asyncio.Future]]):
+        rows = [row for row, _ in batch]
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(self.executor, self.score_fn, rows)
+        except Exception as e:
+            logger.error(f"Batch prediction error ({len(rows)} rows): {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
@@ -0,0 +1,72 @@
+import os
+import logging
+import tempfile
+import numpy as np
+
+# Treelite/TL2cgen are optional: without them (or without a C toolchain)
+# the API falls back to the XGBoost Python predictor.
+try:
+    import treelite
+    import tl2cgen
+except ImportError:
+    treelite = None
+    tl2cgen = None
+
+logger = logging.getLogger(__name__)
+
+
+def load_compiled_predictor(model, libpath: str, model_path: str | None = None):
+    """
+    Compile the XGBoost booster to a native shared library and load it.
+
+    The library is reused if it is newer than `model_path`, so the
+    compilation cost is only paid once per trained model.
+    Returns None when the compiled predictor is unavailable.
+    """
+    if tl2cgen is None:
+        logger.info("Treelite/TL2cgen not installed; using XGBoost predictor.")
+        return None
+
+    try:
+        is_stale = (
+            not os.path.exists(libpath)
+            or (model_path is not None and os.path.getmtime(libpath) < os.path.getmtime(model_path))
+        )
+        if is_stale:
+            logger.info(f"Compiling XGBoost booster to {libpath}...")
+            tl_model = treelite.frontend.from_xgboost(model.get_booster())
+            _export_atomically(tl_model, libpath)
+
+        # One thread per call: batches are small and concurrency comes from
+        # the API's scoring thread pool instead.
+        predictor = tl2cgen.Predictor(libpath, nthread=1)
+        logger.info("Compiled predictor loaded successfully.")
+        return predictor
+
+    except Exception as e:
+        logger.warning(f"Could not build compiled predictor, using XGBoost predictor: {e}")
+        return None
+
+
+def _export_atomically(tl_model, libpath: str):
+    """
+    Compile to a private temp file next to `libpath`, then rename it into
+    place. Several API/test worker processes may compile at once; the
+    rename guarantees none of them ever loads a half-written library.
+    """
+    libdir, name = os.path.split(os.path.abspath(libpath))
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{name}.", suffix=".so", dir=libdir)
+    os.close(fd)
+    try:
+        tl2cgen.export_lib(tl_model, toolchain="gcc", libpath=tmp_path, params={"parallel_comp": 8})
+        os.replace(tmp_path, libpath)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def predict_proba(predictor, X: np.ndarray) -> np.ndarray:
+    """Return the failure probability for each row of a 2-D feature array."""
+    dmat = tl2cgen.DMatrix(np.ascontiguousarray(X, dtype=np.float32), dtype="float32")
+    # Output has shape (n_rows, n_targets, n_classes) = (n, 1, 1) for binary:logistic
+    return predictor.predict(dmat).reshape(-1)
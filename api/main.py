@@ -1,10 +1,13 @@
 import sys
 import os
-import pickle
-import pandas as pd
+import asyncio
+import numpy as np
 import logging
-from fastapi import FastAPI, HTTPException
+import msgspec
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any
 
 # Add project root to sys.path to allow importing from src
@@ -13,13 +16,13 @@ project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if project_root not in sys.path:
     sys.path.append(project_root)
 
-from api.schemas import MachineData
-# Import FeatureEngineer to ensure class definition is available for unpickling
-try:
-    from src.features.feature_engineering import FeatureEngineer
-except ImportError:
-    # If src is not found, we might need to be explicit or check sys.path
-    logging.warning("Could not import FeatureEngineer from src.features.feature_engineering")
+from src.utils.serialization import load_artifact, load_xgboost_model
+from api.schemas import MachineData, MachineRecord
+from api.batching import PredictionBatcher
+from api.compiled_predictor import load_compiled_predictor, predict_proba as compiled_predict_proba
+# FeatureEngineer must be importable for unpickling; FEATURE_ORDER drives the
+# startup checks
+from src.features.feature_engineering import FeatureEngineer, FEATURE_ORDER
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -28,6 +31,22 @@ logger = logging.getLogger(__name__)
 # Global storage for models
 models: dict[str, Any] = {}
 
+# Micro-batching: concurrent requests arriving within MAX_WAIT_MS of each other
+# are scored together in one model call (up to MAX_BATCH_SIZE rows).
+MAX_BATCH_SIZE = int(os.environ.get("PREDICT_MAX_BATCH_SIZE", 64))
+MAX_WAIT_MS = float(os.environ.get("PREDICT_MAX_WAIT_MS", 2))
+
+# Failure probability cut-off used when the model does not carry its own
+# (see decision_threshold in the training config)
+DEFAULT_THRESHOLD = 0.5
+
+# Started in lifespan; /predict scores directly when it is not running
+batcher: PredictionBatcher | None = None
+
+# Scoring runs here instead of on the event loop. XGBoost releases the GIL
+# while predicting, so concurrent batches run in parallel across these threads.
+scoring_executor = ThreadPoolExecutor(max_workers=os.cpu_count(), thread_name_prefix="scoring")
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
@@ -39,75 +58,225 @@ async def lifespan(app: FastAPI):
         # Load Feature Engineer
         fe_path = os.path.join(model_dir, "feature_engineer.pkl")
         if os.path.exists(fe_path):
-            with open(fe_path, "rb") as f:
-                models["feature_engineer"] = pickle.load(f)
+            models["feature_engineer"] = load_artifact(fe_path)
             logger.info("Feature Engineer loaded successfully.")
         else:
             logger.error(f"Feature Engineer not found at {fe_path}")
 
         # Load XGBoost Model
-        model_path = os.path.join(model_dir, "xgboost_model.pkl")
+        model_path = os.path.join(model_dir, "xgboost_model.ubj")
         if os.path.exists(model_path):
-            with open(model_path, "rb") as f:
-                models["model"] = pickle.load(f)
-            logger.info("XGBoost Model loaded successfully.")
+            models["model"] = load_xgboost_model(model_path)
+            # One thread per predict call: requests are tiny, and spinning up
+            # an OpenMP team costs more than it saves. Parallelism comes from
+            # scoring_executor instead.
+            models["model"].set_params(n_jobs=1)
+            threshold = models["model"].get_booster().attr("decision_threshold")
+            models["threshold"] = float(threshold) if threshold is not None else DEFAULT_THRESHOLD
+            logger.info(f"XGBoost Model loaded successfully (decision threshold {models['threshold']:g}).")
+
+            # Compile the booster to native code for low-latency scoring.
+            # The XGBoost model stays loaded as the fallback predictor.
+            predictor = load_compiled_predictor(
+                models["model"], os.path.join(model_dir, "xgb_predictor.so"), model_path
+            )
+            if predictor is not None:
+                models["predictor"] = predictor
         else:
             logger.error(f"XGBoost Model not found at {model_path}")
 
     except Exception as e:
         logger.error(f"Error loading models: {e}")
         # We continue even if models fail to load, but endpoints will error out.
+
+    if "feature_engineer" in models:
+        verify_feature_order()
+
+    if "model" in models:
+        warm_up()
+
+    global batcher
+    batcher = PredictionBatcher(score_rows, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS,
+                                executor=scoring_executor)
+    batcher.start()
     
     yield
     
+    await batcher.stop()
+    batcher = None
     models.clear()
 
-app = FastAPI(title="Predictive Maintenance API", lifespan=lifespan)
-
-@app.post("/predict")
-async def predict(data: MachineData):
-    if "feature_engineer" not in models or "model" not in models:
-        raise HTTPException(status_code=503, detail="Models not loaded")
+def warm_up():
+    """
+    Run a dummy prediction so thread pools and lazy initialisation in the
+    predictors are paid for at startup rather than by the first request.
+    """
+    try:
+        n_features = len(getattr(models.get("feature_engineer"), 'feature_names_', None) or FEATURE_ORDER)
+        X = np.zeros((1, n_features), dtype=np.float32)
+        models["model"].predict_proba(X)
+        if "predictor" in models:
+            compiled_predict_proba(models["predictor"], X)
+        logger.info("Predictors warmed up.")
+    except Exception as e:
+        logger.warning(f"Warm-up prediction failed: {e}")
 
+def verify_feature_order():
+    """
+    Check once at startup that the engineer was fitted on FEATURE_ORDER.
+    transform_row() and transform_rows() always emit that order, so requests
+    don't re-check it.
+    """
     try:
-        # 1. Convert input to DataFrame
-        # model_dump() returns a dict, we wrap it in a list to create a one-row DataFrame
-        df = pd.DataFrame([data.model_dump()])
-        
-        # 2. Transform features
-        # The FeatureEngineer expects a DataFrame and will handle column ordering
-        df_transformed = models["feature_engineer"].transform(df)
-        
-        # 3. Verify column order matches training (defensive check)
-        if hasattr(models["feature_engineer"], 'feature_names_'):
-            expected_cols = models["feature_engineer"].feature_names_
-            actual_cols = df_transformed.columns.tolist()
-            if actual_cols != expected_cols:
-                logger.error(f"❌ Column mismatch! Got {actual_cols}, expected {expected_cols}")
-                raise HTTPException(status_code=500, detail="Feature mismatch between training and inference")
-            logger.debug(f"✅ Features match training: {actual_cols}")
-        else:
-            logger.warning("⚠️ FeatureEngineer missing feature_names_ attribute")
+        check_feature_order(tuple(FEATURE_ORDER))
+    except ValueError as e:
+        # Refuse to serve (503 with the reason) rather than score misaligned features
+        logger.error(f"❌ Predictions disabled: {e}")
+        models["startup_error"] = str(e)
+        models.pop("model", None)
+        models.pop("predictor", None)
 
-        # 4. Predict
-        # predict() returns an array, we take the first element
-        prediction = models["model"].predict(df_transformed)[0]
-        
+def check_feature_order(actual_cols: tuple[str, ...]):
+    """Verify column order matches training, raising ValueError on a mismatch."""
+    expected_cols = getattr(models["feature_engineer"], 'feature_names_', None)
+    if expected_cols is not None:
+        # Engineers pickled before feature_names_ became a tuple store a list
+        if actual_cols != tuple(expected_cols):
+            raise ValueError(
+                f"Feature mismatch between training and inference: got {actual_cols}, "
+                f"expected {tuple(expected_cols)}"
+            )
+        logger.debug(f"✅ Features match training: {actual_cols}")
+    else:
+        logger.warning("⚠️ FeatureEngineer missing feature_names_ attribute")
+
+def models_unavailable() -> HTTPException:
+    """503 for requests arriving while no model is loaded, with the startup reason if any."""
+    return HTTPException(status_code=503, detail=models.get("startup_error", "Models not loaded"))
+
+def predict_one(row: dict) -> dict:
+    """
+    Score a single request (used when no other requests were coalesced with it).
+    """
+    # 1. Transform features
+    # transform_row() builds the (1, n_features) array directly from the dict,
+    # in FEATURE_ORDER, without going through a one-row DataFrame
+    X = models["feature_engineer"].transform_row(row).reshape(1, -1)
+
+    # 2. Predict
+    # (column order was verified against training at startup)
+    # The compiled predictor returns failure probabilities directly
+    if "predictor" in models:
+        failure_prob = float(compiled_predict_proba(models["predictor"], X)[0])
+    else:
         # predict_proba() returns array of probabilities for each class
         # We assume binary classification (0: Safe, 1: Failure)
         # We return the probability of Failure (index 1)
-        probs = models["model"].predict_proba(df_transformed)
-        failure_prob = probs[0][1]
-        
-        return {
-            "prediction": int(prediction),
-            "probability": float(failure_prob)
-        }
+        probs = models["model"].predict_proba(X)
+        failure_prob = float(probs[0][1])
+    
+    # Derive the class from the probability rather than calling predict() too
+    return {
+        "prediction": int(failure_prob > models.get("threshold", DEFAULT_THRESHOLD)),
+        "probability": failure_prob
+    }
+
+def predict_many(rows: list[dict]) -> list[dict]:
+    """
+    Score a batch of requests with a single transform and predict_proba call.
+    """
+    # transform_rows() builds the (n, n_features) array straight from the
+    # dicts, in FEATURE_ORDER, without a request DataFrame
+    # (column order was verified against training at startup)
+    X = models["feature_engineer"].transform_rows(rows)
+
+    # Derive the class from predict_proba() instead of calling the model twice
+    if "predictor" in models:
+        failure_probs = compiled_predict_proba(models["predictor"], X)
+    else:
+        failure_probs = np.asarray(models["model"].predict_proba(X))[:, 1]
+    predictions = failure_probs > models.get("threshold", DEFAULT_THRESHOLD)
+    
+    return [
+        {"prediction": int(pred), "probability": float(prob)}
+        for pred, prob in zip(predictions, failure_probs)
+    ]
+
+def score_rows(rows: list[dict]) -> list[dict]:
+    """Batch scoring entry point for the PredictionBatcher."""
+    if len(rows) == 1:
+        return [predict_one(rows[0])]
+    return predict_many(rows)
+
+# ORJSONResponse serializes the response dicts faster than the stdlib json encoder
+app = FastAPI(title="Predictive Maintenance API", lifespan=lifespan, default_response_class=ORJSONResponse)
+
+# msgspec validates the JSON body and builds the row dict in a single C pass,
+# instead of going through Pydantic model validation on every request.
+# strict=False matches Pydantic's lax mode, e.g. 1500.0 is accepted as an int.
+record_decoder = msgspec.json.Decoder(MachineRecord, strict=False)
+
+batch_decoder = msgspec.json.Decoder(list[MachineRecord], strict=False)
+
+# The body is decoded manually, so document the MachineData schema explicitly
+predict_body_schema = {
+    "requestBody": {
+        "content": {"application/json": {"schema": MachineData.model_json_schema()}},
+        "required": True
+    }
+}
+predict_batch_body_schema = {
+    "requestBody": {
+        "content": {"application/json": {"schema": {"type": "array", "items": MachineData.model_json_schema()}}},
+        "required": True
+    }
+}
+
+@app.post("/predict", openapi_extra=predict_body_schema)
+async def predict(request: Request):
+    try:
+        row = record_decoder.decode(await request.body())
+    except msgspec.DecodeError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    if "feature_engineer" not in models or "model" not in models:
+        raise models_unavailable()
+
+    try:
+        if batcher is None or not batcher.is_running():
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(scoring_executor, predict_one, row)
+        return await batcher.submit(row)
         
     except Exception as e:
         logger.error(f"Prediction error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/predict_batch", openapi_extra=predict_batch_body_schema)
+async def predict_batch(request: Request):
+    """
+    Score a list of records with one transform and one model call,
+    returning one result per record in request order.
+    """
+    try:
+        rows = batch_decoder.decode(await request.body())
+    except msgspec.DecodeError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    if "feature_engineer" not in models or "model" not in models:
+        raise models_unavailable()
+
+    if not rows:
+        return []
+
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(scoring_executor, predict_many, rows)
+
+    except Exception as e:
+        logger.error(f"Batch prediction error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    uvicorn.run(app, host="0.0.0.0", port=8000, loop="uvloop", http="httptools")
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Literal
+from typing import Literal, TypedDict
 
 class MachineData(BaseModel):
     air_temperature: float = Field(..., description="Air temperature in Kelvin [K]", examples=[298.1])
@@ -23,3 +23,16 @@ class MachineData(BaseModel):
             ]
         }
     }
+
+
+class MachineRecord(TypedDict):
+    """
+    Plain-dict form of MachineData, decoded and validated by msgspec on the
+    /predict hot path. MachineData remains the documented (OpenAPI) schema.
+    """
+    air_temperature: float
+    process_temperature: float
+    rotational_speed: int
+    torque: float
+    tool_wear: int
+    type: Literal['L', 'M', 'H']
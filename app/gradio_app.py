@@ -1,10 +1,45 @@
+import bisect
+import functools
+import time
 import gradio as gr
 import requests
-import json
+import orjson
 
 # API Endpoint
 API_URL = "http://127.0.0.1:8000/predict"
 
+# Pooled keep-alive session, so each click reuses an open connection to the API
+_session = requests.Session()
+_adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=0)
+_session.mount("http://", _adapter)
+_session.mount("https://", _adapter)
+
+# Repeated clicks with the same slider settings are answered from this cache.
+# The key includes a fixed CACHE_TTL_S (60 s) time bucket, so an answer is only
+# reused within the same window and a retrained model behind the API shows up
+# in the next one. Entries from past buckets are never looked up again but
+# stay in the lru_cache until they are evicted.
+CACHE_TTL_S = 60
+
+@functools.lru_cache(maxsize=256)
+def _fetch_prediction(key, ttl_bucket):
+    """POST one quantized input tuple to the API. Errors propagate and are not cached."""
+    air_temperature, process_temperature, rotational_speed, torque, tool_wear, type_val = key
+    payload = {
+        "air_temperature": air_temperature,
+        "process_temperature": process_temperature,
+        "rotational_speed": rotational_speed,
+        "torque": torque,
+        "tool_wear": tool_wear,
+        "type": type_val
+    }
+    response = _session.post(
+        API_URL, data=orjson.dumps(payload), headers={"Content-Type": "application/json"}
+    )
+    response.raise_for_status()
+    result = orjson.loads(response.content)
+    return result["prediction"], result["probability"]
+
 # Custom CSS for enhanced styling
 custom_css = """
 @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;600;700&display=swap');
@@ -130,34 +165,9 @@ input[type="range"] {
 }
 """
 
-def get_prediction(air_temperature, process_temperature, rotational_speed, torque, tool_wear, type_val):
-    """
-    Sends data to FastAPI backend and returns the prediction result with enhanced formatting.
-    """
-    payload = {
-        "air_temperature": float(air_temperature),
-        "process_temperature": float(process_temperature),
-        "rotational_speed": int(rotational_speed),
-        "torque": float(torque),
-        "tool_wear": int(tool_wear),
-        "type": type_val
-    }
-    
-    try:
-        response = requests.post(API_URL, json=payload)
-        response.raise_for_status()
-        result = response.json()
-        
-        # Debug print for user
-        # print(f"\n🔍 API Response: Input: {payload}")
-        # print(f"👉 Prediction: {result['prediction']} (Prob: {result['probability']:.4f})")
-        
-        prediction_val = result["prediction"]
-        probability = result["probability"]
-        
-        # Enhanced output formatting with HTML
-        if prediction_val == 1:
-            status_html = f"""
+# Result cards, built once at import. Only the probability, risk level and
+# error message change between clicks, so they are filled in with str.format().
+FAILURE_STATUS_HTML = """
             <div style='background: linear-gradient(135deg, #fee2e2 0%, #fecaca 100%); 
                         padding: 2rem; border-radius: 15px; text-align: center; 
                         border: 3px solid #ef4444; box-shadow: 0 8px 16px rgba(239, 68, 68, 0.2);'>
@@ -170,7 +180,8 @@ def get_prediction(air_temperature, process_temperature, rotational_speed, torqu
                 </div>
             </div>
             """
-            prob_html = f"""
+
+FAILURE_PROB_TEMPLATE = """
             <div style='background: linear-gradient(135deg, #fee2e2 0%, #fecaca 100%); 
                         padding: 2rem; border-radius: 15px; text-align: center;
                         border: 3px solid #ef4444; box-shadow: 0 8px 16px rgba(239, 68, 68, 0.2);'>
@@ -178,15 +189,15 @@ def get_prediction(air_temperature, process_temperature, rotational_speed, torqu
                     FAILURE PROBABILITY
                 </div>
                 <div style='font-size: 2.5rem; font-weight: 700; color: #991b1b;'>
-                    {probability * 100:.2f}%
+                    {prob:.2f}%
                 </div>
                 <div style='font-size: 0.9rem; color: #7f1d1d; margin-top: 0.5rem;'>
-                    Risk Level: {"CRITICAL" if probability > 0.7 else "HIGH" if probability > 0.4 else "MODERATE"}
+                    Risk Level: {risk}
                 </div>
             </div>
             """
-        else:
-            status_html = f"""
+
+SAFE_STATUS_HTML = """
             <div style='background: linear-gradient(135deg, #d1fae5 0%, #a7f3d0 100%); 
                         padding: 2rem; border-radius: 15px; text-align: center;
                         border: 3px solid #10b981; box-shadow: 0 8px 16px rgba(16, 185, 129, 0.2);'>
@@ -199,7 +210,8 @@ def get_prediction(air_temperature, process_temperature, rotational_speed, torqu
                 </div>
             </div>
             """
-            prob_html = f"""
+
+SAFE_PROB_TEMPLATE = """
             <div style='background: linear-gradient(135deg, #d1fae5 0%, #a7f3d0 100%); 
                         padding: 2rem; border-radius: 15px; text-align: center;
                         border: 3px solid #10b981; box-shadow: 0 8px 16px rgba(16, 185, 129, 0.2);'>
@@ -207,18 +219,15 @@ def get_prediction(air_temperature, process_temperature, rotational_speed, torqu
                     FAILURE PROBABILITY
                 </div>
                 <div style='font-size: 2.5rem; font-weight: 700; color: #065f46;'>
-                    {probability * 100:.2f}%
+                    {prob:.2f}%
                 </div>
                 <div style='font-size: 0.9rem; color: #047857; margin-top: 0.5rem;'>
                     Risk Level: LOW
                 </div>
             </div>
             """
-        
-        return status_html, prob_html
-        
-    except requests.exceptions.ConnectionError:
-        error_html = """
+
+CONNECTION_ERROR_HTML = """
         <div style='background: #fef3c7; padding: 1.5rem; border-radius: 12px; 
                     text-align: center; border: 2px solid #f59e0b;'>
             <div style='font-size: 2rem; margin-bottom: 0.5rem;'>🔌</div>
@@ -228,18 +237,53 @@ def get_prediction(air_temperature, process_temperature, rotational_speed, torqu
             </div>
         </div>
         """
-        return error_html, error_html
-    except Exception as e:
-        error_html = f"""
+
+ERROR_TEMPLATE = """
         <div style='background: #fee2e2; padding: 1.5rem; border-radius: 12px; 
                     text-align: center; border: 2px solid #ef4444;'>
             <div style='font-size: 2rem; margin-bottom: 0.5rem;'>❌</div>
             <div style='color: #991b1b; font-weight: 600;'>Error</div>
             <div style='color: #7f1d1d; font-size: 0.9rem; margin-top: 0.3rem;'>
-                {str(e)}
+                {message}
             </div>
         </div>
         """
+
+# Failure risk ladder: probability <= 0.4 is MODERATE, <= 0.7 HIGH, above that CRITICAL
+RISK_THRESHOLDS = (0.4, 0.7)
+RISK_LEVELS = ("MODERATE", "HIGH", "CRITICAL")
+
+def get_prediction(air_temperature, process_temperature, rotational_speed, torque, tool_wear, type_val):
+    """
+    Sends data to FastAPI backend and returns the prediction result with enhanced formatting.
+    """
+    # Quantize to the slider steps so equivalent settings share a cache entry
+    key = (
+        round(float(air_temperature), 1),
+        round(float(process_temperature), 1),
+        int(rotational_speed),
+        round(float(torque), 1),
+        int(tool_wear),
+        type_val
+    )
+    
+    try:
+        prediction_val, probability = _fetch_prediction(key, int(time.monotonic() // CACHE_TTL_S))
+        
+        # Debug print for user
+        # print(f"\n🔍 API Response: Input: {key}")
+        # print(f"👉 Prediction: {prediction_val} (Prob: {probability:.4f})")
+        
+        # Enhanced output formatting with HTML
+        if prediction_val == 1:
+            risk_level = RISK_LEVELS[bisect.bisect_left(RISK_THRESHOLDS, probability)]
+            return FAILURE_STATUS_HTML, FAILURE_PROB_TEMPLATE.format(prob=probability * 100, risk=risk_level)
+        return SAFE_STATUS_HTML, SAFE_PROB_TEMPLATE.format(prob=probability * 100)
+        
+    except requests.exceptions.ConnectionError:
+        return CONNECTION_ERROR_HTML, CONNECTION_ERROR_HTML
+    except Exception as e:
+        error_html = ERROR_TEMPLATE.format(message=str(e))
         return error_html, error_html
 
 # Create Enhanced Gradio Interface
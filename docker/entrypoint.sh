@@ -3,7 +3,8 @@ set -e
 
 # Start FastAPI backend in the background
 # host 0.0.0.0 is crucial for container networking
-uvicorn api.main:app --host 0.0.0.0 --port 8000 &
+# uvloop/httptools replace the default asyncio loop and h11 parser
+uvicorn api.main:app --host 0.0.0.0 --port 8000 --loop uvloop --http httptools &
 
 # Wait for API to be ready
 echo "Waiting for API to start..."
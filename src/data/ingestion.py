@@ -1,20 +1,39 @@
-import pandas as pd
-import yaml
+import pyarrow as pa
+import pyarrow.csv as pacsv
 import os
 import logging
+import tempfile
+import urllib.request
+from src.utils.config import load_config
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def load_config(config_path="src/config/config.yaml"):
-    """Load configuration from the YAML file."""
-    try:
-        with open(config_path, "r") as file:
-            config = yaml.safe_load(file)
-        return config
-    except Exception as e:
-        logging.error(f"Error loading config: {e}")
-        raise
+# Explicit schema for the AI4I CSV: skips type inference in the Arrow reader
+RAW_COLUMN_TYPES = {
+    'UDI': pa.int32(),
+    'Product ID': pa.string(),
+    'Type': pa.string(),
+    'Air temperature [K]': pa.float64(),
+    'Process temperature [K]': pa.float64(),
+    'Rotational speed [rpm]': pa.int32(),
+    'Torque [Nm]': pa.float64(),
+    'Tool wear [min]': pa.int32(),
+    'Machine failure': pa.int8(),
+    'TWF': pa.int8(),
+    'HDF': pa.int8(),
+    'PWF': pa.int8(),
+    'OSF': pa.int8(),
+    'RNF': pa.int8(),
+}
+
+def read_raw_csv(path):
+    """Parse the raw CSV with the multi-threaded Arrow reader."""
+    return pacsv.read_csv(
+        path,
+        read_options=pacsv.ReadOptions(use_threads=True),
+        convert_options=pacsv.ConvertOptions(column_types=RAW_COLUMN_TYPES)
+    )
 
 def ingest_data(config_path="src/config/config.yaml"):
     """Download AI4I dataset and save to raw folder."""
@@ -28,35 +47,45 @@ def ingest_data(config_path="src/config/config.yaml"):
     # 1. Load or Download
     if os.path.exists(raw_path):
         logging.info(f"File found at {raw_path}. Loading locally...")
-        df = pd.read_csv(raw_path)
     else:
         logging.info(f"Downloading data from {url}...")
+        # Download next to raw_path and rename into place, so an interrupted
+        # download never leaves a truncated file that later runs would load
+        fd, tmp_path = tempfile.mkstemp(prefix=".download.", dir=os.path.dirname(raw_path) or ".")
+        os.close(fd)
         try:
-            df = pd.read_csv(url)
-            df.to_csv(raw_path, index=False)
+            urllib.request.urlretrieve(url, tmp_path)
+            os.replace(tmp_path, raw_path)
             logging.info(f"Data saved to {raw_path}")
         except Exception as e:
             logging.error(f"Failed to ingest data: {e}")
             raise
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    table = read_raw_csv(raw_path)
 
     # 2. Validation & Sanity Checks (Run this ALWAYS)
-    logging.info(f"Dataset Shape: {df.shape}")
+    # Checks run directly on the Arrow table, before any conversion to pandas
+    logging.info(f"Dataset Shape: {(table.num_rows, table.num_columns)}")
 
     expected_cols = ['UDI', 'Product ID', 'Type', 'Air temperature [K]', 
                      'Process temperature [K]', 'Rotational speed [rpm]', 
                      'Torque [Nm]', 'Tool wear [min]', 'Machine failure', 
                      'TWF', 'HDF', 'PWF', 'OSF', 'RNF']
     
-    missing_cols = [col for col in expected_cols if col not in df.columns]
+    missing_cols = [col for col in expected_cols if col not in table.column_names]
     if not missing_cols:
         logging.info("✔ Column validation passed.")
     else:
         logging.warning(f"⚠ Missing columns: {missing_cols}")
 
     # Log specific stats relevant to this dataset
-    logging.info(f"Null values:\n{df.isnull().sum()[df.isnull().sum() > 0]}") # Only show cols with nulls
+    null_counts = {name: table.column(name).null_count for name in table.column_names}
+    logging.info(f"Null values: { {k: v for k, v in null_counts.items() if v > 0} }") # Only show cols with nulls
     
-    return df
+    return table.to_pandas(self_destruct=True)
 
 if __name__ == "__main__":
     ingest_data()
\ No newline at end of file
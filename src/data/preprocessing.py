@@ -1,37 +1,75 @@
 import pandas as pd
-import yaml
 import os
 import logging
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import StratifiedShuffleSplit
+from src.utils.config import load_config
+
+# Polars is optional: pl_clean_column_names() needs it, the pandas pipeline doesn't
+try:
+    import polars as pl
+except ImportError:
+    pl = None
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def load_config(config_path="src/config/config.yaml"):
-    try:
-        with open(config_path, "r") as file:
-            return yaml.safe_load(file)
-    except Exception as e:
-        logging.error(f"Error loading config: {e}")
-        raise
+# Per-failure-mode flags, kept out of the train/test splits
+FAILURE_TYPE_COLS = ['twf', 'hdf', 'pwf', 'osf', 'rnf']
 
-def clean_column_names(df):
+# Explicit dtypes for the processed splits (AI4I schema), stored in the
+# Parquet files so the pipelines never re-infer them. Sensor readings stay
+# float64 so training sees exactly the values the API computes features from.
+PROCESSED_DTYPES = {
+    'type': 'category',
+    'air_temperature': 'float64',
+    'process_temperature': 'float64',
+    'rotational_speed': 'int32',
+    'torque': 'float64',
+    'tool_wear': 'int32',
+    'machine_failure': 'int8'
+}
+
+def read_processed(path, columns=None):
     """
-    Standardize column names to snake_case and remove units.
-    Matches the logic used in the EDA notebook.
+    Read a processed split, optionally only the given columns. Parquet is the
+    default format; CSV splits from older runs are still accepted and cast
+    to PROCESSED_DTYPES.
     """
-    df.columns = [
+    if str(path).endswith('.csv'):
+        df = pd.read_csv(path, engine='pyarrow', usecols=columns)
+        return df.astype({col: dtype for col, dtype in PROCESSED_DTYPES.items() if col in df.columns})
+    return pd.read_parquet(path, engine='pyarrow', columns=columns)
+
+def clean_column_name(col):
+    """Snake_case version of a raw AI4I column name, without its unit."""
+    return (
         col.replace('[K]', '')
            .replace('[rpm]', '')
            .replace('[Nm]', '')
            .replace('[min]', '')
            .strip()
            .replace(' ', '_')
-           .lower() 
-        for col in df.columns
-    ]
+           .lower()
+    )
+
+def clean_column_names(df):
+    """
+    Standardize column names to snake_case and remove units.
+    Matches the logic used in the EDA notebook.
+    """
+    df.columns = [clean_column_name(col) for col in df.columns]
     return df
 
+def pl_clean_column_names(lf):
+    """
+    Polars counterpart of clean_column_names() for a LazyFrame (e.g. from
+    pl.scan_csv): the rename is only added to the query plan, so nothing
+    is read or copied until the caller collects.
+    """
+    if pl is None:
+        raise ImportError("pl_clean_column_names() requires polars")
+    return lf.rename({col: clean_column_name(col) for col in lf.columns})
+
 def preprocess_and_split():
     """
     Load raw data, clean columns, and perform stratified split.
@@ -41,6 +79,7 @@ def preprocess_and_split():
     raw_path = config['data']['raw_path']
     train_path = config['data']['processed_train_path']
     test_path = config['data']['processed_test_path']
+    failure_types_path = config['data']['failure_types_path']
     
     test_size = config['training']['test_size']
     random_state = config['training']['random_state']
@@ -50,35 +89,50 @@ def preprocess_and_split():
         raise FileNotFoundError(f"{raw_path} not found. Please run src/data/ingestion.py first.")
     
     logging.info("Loading raw data...")
-    df = pd.read_csv(raw_path)
+    df = pd.read_csv(raw_path, engine='pyarrow')
     
     # 2. Clean Columns
     df = clean_column_names(df)
     
-    # 3. Drop ID columns (irrelevant for training)
-    # We keep failure types (twf, hdf, etc) for now in train/test 
-    # so we can analyze them later if needed, but we will drop them during training.
-    cols_to_drop = ['udi', 'product_id']
+    # 3. Move failure types (twf, hdf, etc) to a sidecar file keyed by udi.
+    # Training never uses them, so they no longer bloat train/test, but they
+    # stay available for later analysis.
+    analysis_cols = [c for c in FAILURE_TYPE_COLS if c in df.columns]
+    os.makedirs(os.path.dirname(train_path), exist_ok=True)
+    if analysis_cols:
+        df[['udi', 'machine_failure'] + analysis_cols].to_parquet(
+            failure_types_path, engine='pyarrow', compression='zstd', index=False
+        )
+        logging.info(f"Failure types saved to {failure_types_path}")
+    
+    # 4. Drop product ID and failure type columns (irrelevant for training).
+    # udi stays in the splits so they can be joined back to the sidecar;
+    # the pipelines only read FEATURE_COLS and the target.
+    cols_to_drop = ['product_id'] + analysis_cols
     df = df.drop(columns=cols_to_drop, errors='ignore')
+    df = df.astype({col: dtype for col, dtype in PROCESSED_DTYPES.items() if col in df.columns})
     
-    # 4. Stratified Split
+    # 5. Stratified Split
     logging.info("Splitting data...")
-    # Stratify by 'machine_failure' to handle class imbalance
-    train_df, test_df = train_test_split(
-        df, 
-        test_size=test_size, 
-        random_state=random_state, 
-        stratify=df['machine_failure']
-    )
+    # Stratify by 'machine_failure' to handle class imbalance.
+    # Only index arrays are produced here (same split as train_test_split).
+    splitter = StratifiedShuffleSplit(n_splits=1, test_size=test_size, random_state=random_state)
+    train_idx, test_idx = next(splitter.split(df, df['machine_failure']))
     
-    # 5. Save processed split
-    os.makedirs(os.path.dirname(train_path), exist_ok=True)
-    train_df.to_csv(train_path, index=False)
-    test_df.to_csv(test_path, index=False)
+    # 6. Save processed split
+    # Parquet keeps the dtypes and is much faster to write/read than CSV.
+    # Each split is materialized, written and released in turn, so both are
+    # never held in memory at the same time.
+    shapes = {}
+    for name, path, idx in (("Train", train_path, train_idx), ("Test", test_path, test_idx)):
+        split_df = df.iloc[idx]
+        split_df.to_parquet(path, engine='pyarrow', compression='zstd', index=False)
+        shapes[name] = split_df.shape
+        del split_df
     
     logging.info(f"✅ Split completed.")
-    logging.info(f"Train set: {train_path} | Shape: {train_df.shape}")
-    logging.info(f"Test set:  {test_path} | Shape: {test_df.shape}")
+    logging.info(f"Train set: {train_path} | Shape: {shapes['Train']}")
+    logging.info(f"Test set:  {test_path} | Shape: {shapes['Test']}")
 
 if __name__ == "__main__":
     preprocess_and_split()
\ No newline at end of file
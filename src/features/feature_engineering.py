@@ -1,11 +1,63 @@
+import sys
+import functools
 import pandas as pd
 import numpy as np
 import logging
 from sklearn.base import BaseEstimator, TransformerMixin
 
+# Numba is optional: large batches use a compiled kernel when it is installed
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
 # Configure logging specific to this module
 logger = logging.getLogger(__name__)
 
+# Standard order of the engineered features, as expected by the model
+FEATURE_ORDER = [
+    'type', 'air_temperature', 'process_temperature', 
+    'rotational_speed', 'torque', 'tool_wear',
+    'temp_difference', 'power_factor', 'strain_wear_product'
+]
+
+# Raw numeric inputs of the derived features
+NUMERIC_INPUTS = ['air_temperature', 'process_temperature', 'rotational_speed', 'torque', 'tool_wear']
+
+# Raw columns FeatureEngineer consumes (the model inputs before engineering)
+FEATURE_COLS = ['type'] + NUMERIC_INPUTS
+_FEATURE_COL_SET = frozenset(FEATURE_COLS)
+
+# Batches above this size go through the Numba kernel; below it, thread
+# start-up costs more than the arithmetic itself
+NUMBA_MIN_ROWS = 1024
+
+if njit is not None:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _derive_features_kernel(at, pt, rpm, tq, tw, out):
+        """
+        Fused parallel pass over the NUMERIC_INPUTS columns (1-D arrays),
+        writing temp_difference, power_factor and strain_wear_product into
+        out (3, N) (computed in float64, stored as out's float32).
+        """
+        for i in prange(at.shape[0]):
+            out[0, i] = pt[i] - at[i]
+            out[1, i] = tq[i] * rpm[i]
+            out[2, i] = tq[i] * tw[i]
+else:
+    _derive_features_kernel = None
+
+@functools.lru_cache(maxsize=8)
+def _type_encoding(mapping_items, default_value):
+    """
+    Categories and code lookup table for a 'type' mapping, built once per
+    mapping. Index -1 (unknown/missing category) hits the trailing default.
+    """
+    categories = pd.Index([key for key, _ in mapping_items])
+    lookup = np.array([value for _, value in mapping_items] + [default_value], dtype=np.int64)
+    lookup.setflags(write=False)
+    return categories, lookup
+
 class FeatureEngineer(BaseEstimator, TransformerMixin):
     """
     Encapsulates feature engineering logic for the AI4I dataset.
@@ -26,61 +78,140 @@ class FeatureEngineer(BaseEstimator, TransformerMixin):
         """
         return self
 
-    def transform(self, X):
+    def transform(self, X, copy=True):
         """
         Apply physics-based feature engineering and encoding.
+        The result is a new frame in FEATURE_ORDER: numeric inputs and derived
+        features as float32, 'type' as int64. X itself is never modified;
+        `copy` is accepted for backward compatibility and ignored.
         """
         # 1. Validation
         if not isinstance(X, pd.DataFrame):
             raise TypeError(f"Input must be a pandas DataFrame, got {type(X)}")
 
-        # Work on a copy to avoid side effects
-        df = X.copy()
+        df = X
+        # Output columns as 1-D arrays; the result frame is built from them in
+        # one go instead of inserting columns and reordering afterwards
+        columns = {}
         
         # 2. Physics-Based Feature Construction
-        # We check for column existence to make the transformer robust to partial inputs
+        # We check for column existence to make the transformer robust to partial inputs.
+        # The derived features are written into a single preallocated buffer
+        # (one contiguous row per feature) rather than built as pandas Series.
+        # Features are emitted as float32, the precision XGBoost predicts in;
+        # the arithmetic itself stays float64 and is rounded once on store,
+        # so values match transform_row() exactly.
+        # Which of the raw inputs are present, resolved against X's columns once
+        present = _FEATURE_COL_SET.intersection(df.columns)
+        has_temps = {'process_temperature', 'air_temperature'} <= present
+        has_power = {'torque', 'rotational_speed'} <= present
+        has_strain = {'torque', 'tool_wear'} <= present
+        derived = np.empty((3, len(df)), dtype=np.float32)
+        # Inputs are pulled out as 1-D NumPy arrays once: `raw` is the float64
+        # version the arithmetic runs on (float64 columns are views, not
+        # copies), `inputs` the float32 version for the output frame.
+        # Nullable columns (Int64, Float64) map pd.NA to NaN
+        raw = {col: df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+               for col in NUMERIC_INPUTS if col in present}
+        inputs = {col: values.astype(np.float32) for col, values in raw.items()}
+
+        if (_derive_features_kernel is not None and len(df) > NUMBA_MIN_ROWS
+                and has_temps and has_power and has_strain):
+            # Large complete batches: one fused pass in compiled, multi-threaded code
+            _derive_features_kernel(*(raw[col] for col in NUMERIC_INPUTS), derived)
+        else:
+            # Otherwise combine the columns with ufuncs
+            if has_temps:
+                np.subtract(raw['process_temperature'], raw['air_temperature'], out=derived[0])
+            if has_power:
+                np.multiply(raw['torque'], raw['rotational_speed'], out=derived[1])
+            if has_strain:
+                np.multiply(raw['torque'], raw['tool_wear'], out=derived[2])
         
         # Temp Difference: Critical for Heat Dissipation Failure (HDF)
-        if 'process_temperature' in df.columns and 'air_temperature' in df.columns:
-            df['temp_difference'] = df['process_temperature'] - df['air_temperature']
+        if has_temps:
+            columns['temp_difference'] = derived[0]
         else:
             logger.warning("Missing temperature columns; 'temp_difference' not created.")
 
         # Power Factor: Critical for Power Failure (PWF)
-        if 'torque' in df.columns and 'rotational_speed' in df.columns:
-            df['power_factor'] = df['torque'] * df['rotational_speed']
+        if has_power:
+            columns['power_factor'] = derived[1]
         else:
             logger.warning("Missing torque/speed columns; 'power_factor' not created.")
 
         # Strain Wear Product: Critical for Overstrain Failure (OSF)
-        if 'torque' in df.columns and 'tool_wear' in df.columns:
-            df['strain_wear_product'] = df['torque'] * df['tool_wear']
+        if has_strain:
+            columns['strain_wear_product'] = derived[2]
         else:
             logger.warning("Missing torque/wear columns; 'strain_wear_product' not created.")
         
         # 3. Categorical Encoding
-        if 'type' in df.columns:
-            # Map values, fill missing/unknowns with default (Medium), and force integer type
-            df['type'] = df['type'].map(self.type_mapping).fillna(self.default_type_value).astype(int)
+        if 'type' in present:
+            # Categorical codes index into a lookup table of encoded values;
+            # missing/unknown types get code -1, i.e. the last entry (default = Medium)
+            categories, lookup = _type_encoding(tuple(self.type_mapping.items()), self.default_type_value)
+            codes = pd.Categorical(df['type'], categories=categories).codes
+            columns['type'] = lookup[codes]
         
         # 4. Enforce Consistent Column Ordering
-        # Define the standard order for features
-        standard_order = [
-            'type', 'air_temperature', 'process_temperature', 
-            'rotational_speed', 'torque', 'tool_wear',
-            'temp_difference', 'power_factor', 'strain_wear_product'
-        ]
-        
-        # Reorder columns to match standard order (only include columns that exist)
-        df = df[[col for col in standard_order if col in df.columns]]
+        # Assemble the output in standard order (only include columns that exist)
+        # from the arrays gathered above, without looking columns up in X again
+        columns.update(inputs)
+        df = pd.DataFrame(
+            {col: columns[col] for col in FEATURE_ORDER if col in columns},
+            index=df.index, copy=False
+        )
         
         # Store feature names on first transform (typically during fit_transform in training)
+        # (as a tuple of interned strings, so equality checks against it are cheap)
         if self.feature_names_ is None:
-            self.feature_names_ = df.columns.tolist()
+            self.feature_names_ = tuple(sys.intern(col) for col in df.columns)
             logger.info(f"Feature names set: {self.feature_names_}")
             
         return df
 
+    def transform_row(self, d):
+        """
+        Fast path for single-record inference.
+        Builds the engineered feature vector (in FEATURE_ORDER) straight from a
+        dict of raw values, skipping DataFrame construction and pandas ops.
+        """
+        t = self.type_mapping.get(d['type'], self.default_type_value)
+        air_temp = d['air_temperature']
+        process_temp = d['process_temperature']
+        speed = d['rotational_speed']
+        torque = d['torque']
+        wear = d['tool_wear']
+
+        # Plain scalar arithmetic on purpose: for nine values the cost is the
+        # call itself, and a Numba kernel here measured no faster (~2 us either way)
+        out = np.empty(len(FEATURE_ORDER), dtype=np.float32)
+        out[:] = (
+            t, air_temp, process_temp, speed, torque, wear,
+            process_temp - air_temp, torque * speed, torque * wear
+        )
+        return out
+
+    def transform_rows(self, rows):
+        """
+        Batch counterpart of transform_row() for a list of raw-value dicts.
+        Returns an (n_rows, n_features) float32 array in FEATURE_ORDER.
+        """
+        mapping, default = self.type_mapping, self.default_type_value
+        # (n, 5) float64 block of the numeric inputs, in NUMERIC_INPUTS order
+        raw = np.array([[d[col] for col in NUMERIC_INPUTS] for d in rows], dtype=np.float64)
+        raw = raw.reshape(len(rows), len(NUMERIC_INPUTS))
+        air_temp, process_temp, speed, torque, wear = raw.T
+
+        out = np.empty((len(rows), len(FEATURE_ORDER)), dtype=np.float32)
+        out[:, 0] = [mapping.get(d['type'], default) for d in rows]
+        out[:, 1:6] = raw
+        out[:, 6] = process_temp - air_temp
+        out[:, 7] = torque * speed
+        out[:, 8] = torque * wear
+        return out
+
 if __name__ == "__main__":
     # Quick sanity check when running this file directly
     try:
@@ -1,53 +1,115 @@
-import pandas as pd
-import yaml
-import pickle
-import logging
 import os
-import mlflow
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.metrics import f1_score, recall_score, precision_score, classification_report, confusion_matrix
+import glob
+import hashlib
+import numpy as np
+import xgboost as xgb
+import logging
+from src.data.preprocessing import read_processed
+from src.features.feature_engineering import FEATURE_COLS, FEATURE_ORDER
+from src.utils.config import load_config
+from src.utils.serialization import load_artifact, load_xgboost_model
+from src.utils.tracking import mlflow_call, start_run
+from sklearn.metrics import classification_report
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def load_config(config_path="src/config/config.yaml"):
-    with open(config_path, "r") as file:
-        return yaml.safe_load(file)
+# <--- CHANGED THESE PATHS
+MODEL_PATH = "models/xgboost_model.ubj"
+ENGINEER_PATH = "models/feature_engineer.pkl"
 
 def load_artifacts():
     """Load the saved model and engineer from the ROOT models folder."""
-    # <--- CHANGED THESE PATHS
-    model_path = "models/xgboost_model.pkl"
-    engineer_path = "models/feature_engineer.pkl"
-    
-    if not os.path.exists(model_path) or not os.path.exists(engineer_path):
-        raise FileNotFoundError("❌ Artifacts not found in models/ folder. Run training_pipeline.py first.")
-
-    with open(model_path, "rb") as f:
-        model = pickle.load(f)
-        
-    with open(engineer_path, "rb") as f:
-        engineer = pickle.load(f)
+    try:
+        model = load_xgboost_model(MODEL_PATH)
+        engineer = load_artifact(ENGINEER_PATH)
+    except FileNotFoundError as e:
+        raise FileNotFoundError("❌ Artifacts not found in models/ folder. Run training_pipeline.py first.") from e
         
     return model, engineer
 
+# Bump whenever FeatureEngineer.transform changes its output (values or
+# dtypes), so DMatrix caches built by older code are not reused
+DMATRIX_CACHE_VERSION = 2
+DMATRIX_CACHE_PREFIX = "pm_eval_dmat_"
+# Default cache location when the config has no data.cache_dir
+DMATRIX_CACHE_DIR = "data/cache"
+
+def dmatrix_cache_path(cache_dir, *paths):
+    """
+    Location in cache_dir of the cached test DMatrix for the given input files.
+
+    The name is derived from each file's size and mtime, so rewriting the
+    test split or retraining the engineer points at a fresh cache entry,
+    plus a tag for the feature code (DMATRIX_CACHE_VERSION, FEATURE_ORDER)
+    and the XGBoost version that wrote the binary.
+    """
+    tag = hashlib.sha1(repr((DMATRIX_CACHE_VERSION, FEATURE_ORDER, xgb.__version__)).encode()).hexdigest()[:12]
+    key = "_".join(f"{st.st_size:x}-{st.st_mtime_ns:x}" for st in map(os.stat, paths))
+    return os.path.join(cache_dir, f"{DMATRIX_CACHE_PREFIX}{tag}_{key}.buffer")
+
+def get_cached_dmatrix(cache_path, build_fn):
+    """
+    Load the DMatrix binary at cache_path, or build it with build_fn and save
+    it there, deleting the other (stale) cache files in the same directory.
+    The directory should belong to this project (see DMATRIX_CACHE_DIR).
+    """
+    try:
+        return xgb.DMatrix(cache_path)
+    except xgb.core.XGBoostError:
+        pass
+    dmat = build_fn()
+    cache_dir = os.path.dirname(cache_path)
+    os.makedirs(cache_dir or ".", exist_ok=True)
+    dmat.save_binary(cache_path)
+    for stale in glob.glob(os.path.join(cache_dir, f"{DMATRIX_CACHE_PREFIX}*.buffer")):
+        if os.path.abspath(stale) != os.path.abspath(cache_path):
+            try:
+                os.remove(stale)
+            except OSError as e:
+                logging.warning(f"Could not remove stale DMatrix cache {stale}: {e}")
+    return dmat
+
+def binary_confusion_matrix(y_true, y_pred):
+    """
+    2x2 confusion matrix [[tn, fp], [fn, tp]] for 0/1 labels, counted with a
+    single bincount over the encoded (true, predicted) pairs.
+    """
+    yt = np.asarray(y_true, dtype=np.int8)
+    yp = np.asarray(y_pred, dtype=np.int8)
+    return np.bincount((yt << 1) | yp, minlength=4).reshape(2, 2)
+
+def binary_metrics(cm):
+    """
+    Precision, recall and F1 for the failure class from a 2x2 confusion
+    matrix (0.0 when undefined, like sklearn's zero_division default).
+    """
+    tn, fp, fn, tp = cm.ravel()
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {
+        "test_f1": float(f1),
+        "test_recall": float(recall),
+        "test_precision": float(precision)
+    }
+
 def run_evaluation():
     config = load_config()
     
-    mlflow.set_tracking_uri("file:./mlruns")
-    mlflow.set_experiment("predictive_maintenance_prod")
+    mlflow_call("set_tracking_uri", "file:./mlruns")
+    mlflow_call("set_experiment", "predictive_maintenance_prod")
     
-    with mlflow.start_run(run_name="pipeline_evaluation"):
+    with start_run("pipeline_evaluation"):
         # 1. Load Test Data
         test_path = config['data']['processed_test_path']
         logging.info(f"Loading processed test data from {test_path}...")
-        df_test = pd.read_csv(test_path)
-        
         target = "machine_failure"
-        drop_cols = [target, 'twf', 'hdf', 'pwf', 'osf', 'rnf']
+        # Only the model inputs and the target are read from disk
+        df_test = read_processed(test_path, columns=FEATURE_COLS + [target])
         
-        X_test = df_test.drop(columns=[c for c in drop_cols if c in df_test.columns])
-        y_test = df_test[target]
+        # pop() removes the target in place, so X_test needs no copy of the features
+        y_test = df_test.pop(target)
+        X_test = df_test
         
         # 2. Load Artifacts from Root models/
         logging.info("Loading pre-trained model and engineer...")
@@ -58,12 +120,21 @@ def run_evaluation():
             return
 
         # 3. Apply Engineering (Transform ONLY)
-        X_test_eng = engineer.transform(X_test)
+        # The engineered DMatrix is cached on disk keyed by the test split and
+        # engineer files, so repeated evaluations skip transform + construction
+        def build_dmatrix():
+            # float32 like in training (what XGBoost predicts on internally)
+            X_test_eng = engineer.transform(X_test).astype(np.float32)
+            arr = np.ascontiguousarray(X_test_eng.to_numpy(dtype=np.float32, copy=False))
+            return xgb.DMatrix(arr, feature_names=list(X_test_eng.columns))
+        
+        cache_dir = config['data'].get('cache_dir', DMATRIX_CACHE_DIR)
+        dmat = get_cached_dmatrix(dmatrix_cache_path(cache_dir, test_path, ENGINEER_PATH), build_dmatrix)
         
         # Verify feature order matches training
         if hasattr(engineer, 'feature_names_') and engineer.feature_names_:
-            actual_cols = X_test_eng.columns.tolist()
-            if actual_cols != engineer.feature_names_:
+            actual_cols = tuple(dmat.feature_names)
+            if actual_cols != tuple(engineer.feature_names_):
                 logging.warning(f"⚠️ Column mismatch! Expected: {engineer.feature_names_}, Got: {actual_cols}")
             else:
                 logging.info("✅ Feature columns match training order")
@@ -72,32 +143,56 @@ def run_evaluation():
         
         # 4. Predict
         logging.info("Running predictions on Test set...")
-        y_pred = model.predict(X_test_eng)
+        # Score on the booster directly with the float32 DMatrix, skipping the
+        # sklearn wrapper's DataFrame validation and conversion
+        booster = model.get_booster()
+        failure_probs = booster.predict(dmat)
+        
+        # Same cut-off as the API (see decision_threshold in the training config)
+        threshold = float(booster.attr("decision_threshold") or 0.5)
+        y_pred = (failure_probs > threshold).astype(np.int8)
         
         # 5. Metrics
-        metrics = {
-            "test_f1": f1_score(y_test, y_pred),
-            "test_recall": recall_score(y_test, y_pred),
-            "test_precision": precision_score(y_test, y_pred)
-        }
+        # One pass over the predictions; precision/recall/F1 come from its cells
+        cm = binary_confusion_matrix(y_test, y_pred)
+        metrics = binary_metrics(cm)
         
         logging.info(f"📊 Evaluation Results: {metrics}")
-        print("\n" + classification_report(y_test, y_pred))
+        if config.get('evaluation', {}).get('verbose', False):
+            print("\n" + classification_report(y_test, y_pred))
         
         # 6. Log Metrics
-        mlflow.log_metrics(metrics)
+        mlflow_call("log_metrics", metrics)
         
         # 7. Confusion Matrix
-        cm = confusion_matrix(y_test, y_pred)
-        plt.figure(figsize=(6, 5))
-        sns.heatmap(cm, annot=True, fmt='d', cmap='Blues')
-        plt.title("Evaluation Pipeline Confusion Matrix")
-        plt.ylabel("True Label")
-        plt.xlabel("Predicted Label")
+        # Matplotlib is only imported here, so importing this module
+        # (e.g. for load_artifacts) stays cheap
+        import matplotlib
+        # Non-interactive backend: the plot is only ever written to a file
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+        
+        # Plain imshow + cell annotations: a 2x2 matrix doesn't need seaborn
+        fig, ax = plt.subplots(figsize=(6, 5))
+        im = ax.imshow(cm, cmap='Blues')
+        fig.colorbar(im, ax=ax)
+        # Dark text on light cells, white text on dark ones
+        text_threshold = cm.max() / 2
+        for i in range(cm.shape[0]):
+            for j in range(cm.shape[1]):
+                ax.text(j, i, str(cm[i, j]), ha='center', va='center',
+                        color='white' if cm[i, j] > text_threshold else 'black')
+        ax.set_xticks(range(cm.shape[1]))
+        ax.set_yticks(range(cm.shape[0]))
+        ax.set_title("Evaluation Pipeline Confusion Matrix")
+        ax.set_ylabel("True Label")
+        ax.set_xlabel("Predicted Label")
         
         plot_path = "evaluation_confusion_matrix.png"
-        plt.savefig(plot_path)
-        mlflow.log_artifact(plot_path)
+        fig.savefig(plot_path)
+        # Release the figure so repeated evaluations don't accumulate canvases
+        plt.close(fig)
+        mlflow_call("log_artifact", plot_path)
         
         logging.info("✅ Evaluation Complete.")
 
@@ -1,47 +1,63 @@
-import pandas as pd
+import numpy as np
 import xgboost as xgb
-import yaml
-import pickle
 import logging
 import os
-import mlflow
-import mlflow.xgboost
-from src.features.feature_engineering import FeatureEngineer
+from src.features.feature_engineering import FeatureEngineer, FEATURE_COLS
+from src.data.preprocessing import read_processed
+from src.utils.config import load_config
+from src.utils.serialization import save_artifact
+from src.utils.tracking import mlflow_call, start_run
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def load_config(config_path="src/config/config.yaml"):
+def gpu_available():
+    """True when CuPy can see at least one CUDA device."""
     try:
-        with open(config_path, "r") as file:
-            return yaml.safe_load(file)
-    except FileNotFoundError:
-        logging.error(f"Config file not found at {config_path}")
-        raise
+        import cupy
+        return cupy.cuda.runtime.getDeviceCount() > 0
+    except Exception:
+        return False
+
+def resolve_device(requested="cpu"):
+    """
+    Map the configured model.device ("cpu", "cuda" or "auto") to the device
+    XGBoost trains on, falling back to CPU when no GPU is available.
+    """
+    if requested == "cpu":
+        return "cpu"
+    if gpu_available():
+        return "cuda"
+    if requested != "auto":
+        logging.warning(f"model.device is '{requested}' but no GPU is available; training on CPU.")
+    return "cpu"
 
 def run_training():
     config = load_config()
     
-    mlflow.set_tracking_uri("file:./mlruns")
-    mlflow.set_experiment("predictive_maintenance_prod")
+    mlflow_call("set_tracking_uri", "file:./mlruns")
+    mlflow_call("set_experiment", "predictive_maintenance_prod")
     
-    with mlflow.start_run(run_name="pipeline_training"):
+    with start_run("pipeline_training"):
         # 1. Load Data
         train_path = config['data']['processed_train_path']
         logging.info(f"Loading processed training data from {train_path}...")
-        df_train = pd.read_csv(train_path)
-        
-        # 2. Separate Target
         target = "machine_failure"
-        drop_cols = [target, 'twf', 'hdf', 'pwf', 'osf', 'rnf']
+        # Only the model inputs and the target are read from disk
+        df_train = read_processed(train_path, columns=FEATURE_COLS + [target])
         
-        X_train = df_train.drop(columns=[c for c in drop_cols if c in df_train.columns])
-        y_train = df_train[target]
+        # 2. Separate Target
+        # pop() removes the target in place, so X_train needs no copy of the features
+        y_train = df_train.pop(target).astype(np.int8, copy=False)
+        X_train = df_train
         
         # 3. Feature Engineering
         logging.info("Fitting Feature Engineer...")
         engineer = FeatureEngineer()
         X_train_eng = engineer.fit_transform(X_train)
+        # XGBoost bins on float32 anyway, so casting here loses nothing and
+        # gives a single float32 block that DMatrix can use without converting
+        X_train_eng = X_train_eng.astype(np.float32)
         
         # Log feature names for verification
         logging.info(f"Engineered features: {engineer.feature_names_}")
@@ -49,30 +65,46 @@ def run_training():
         
         # 4. Train Model
         logging.info("Training XGBoost Model...")
-        params = config['model']['params']
+        params = dict(config['model']['params'])
+        # Histogram split finding, multi-threaded, unless the config says otherwise
+        params.setdefault('tree_method', 'hist')
+        params.setdefault('grow_policy', 'lossguide')
+        params.setdefault('n_jobs', os.cpu_count())
+        params.setdefault('max_bin', 256)
+        params['device'] = resolve_device(config['model'].get('device', 'cpu'))
+        logging.info(f"XGBoost params: {params}")
         model = xgb.XGBClassifier(**params)
         model.fit(X_train_eng, y_train)
         
+        # Single-row scoring is faster on CPU, so the saved model never asks
+        # for a GPU at inference time (only large batches would benefit)
+        model.set_params(device="cpu")
+        
+        # Booster attributes are saved with the model, so the serving threshold
+        # can be tuned here without touching the API code
+        threshold = config['model'].get('decision_threshold', 0.5)
+        model.get_booster().set_attr(decision_threshold=str(threshold))
+        
         # 5. Save Artifacts to Root 'models/' folder
         output_dir = "models"  
         os.makedirs(output_dir, exist_ok=True)
         
-        model_path = os.path.join(output_dir, "xgboost_model.pkl")
+        model_path = os.path.join(output_dir, "xgboost_model.ubj")
         engineer_path = os.path.join(output_dir, "feature_engineer.pkl")
         
         logging.info(f"Saving artifacts to {output_dir}...")
         
-        with open(model_path, "wb") as f:
-            pickle.dump(model, f)
-            
-        with open(engineer_path, "wb") as f:
-            pickle.dump(engineer, f)
+        # The model uses XGBoost's native UBJSON format (no sklearn pickle graph);
+        # the engineer is a protocol 5 pickle with a sibling .buffers file
+        model.save_model(model_path)
+        save_artifact(engineer, engineer_path)
             
         logging.info(f"✅ Training finished. Model and Engineer saved to {output_dir}/")
         
         # 6. Log to MLflow
-        mlflow.log_params(params)
-        mlflow.xgboost.log_model(model, "model")
+        mlflow_call("log_params", params)
+        mlflow_call("log_param", "decision_threshold", threshold)
+        mlflow_call("xgboost.log_model", model, "model")
 
 if __name__ == "__main__":
     run_training()
\ No newline at end of file
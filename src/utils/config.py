@@ -0,0 +1,22 @@
+import logging
+import functools
+import yaml
+
+logger = logging.getLogger(__name__)
+
+# C-accelerated YAML parser when libyaml is available
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+@functools.lru_cache(maxsize=4)
+def load_config(config_path: str = "src/config/config.yaml") -> dict:
+    """
+    Load configuration from the YAML file (parsed once per path and process).
+    Callers share the cached dict, so they must not modify it.
+    """
+    try:
+        with open(config_path, "r") as file:
+            return yaml.load(file, Loader=YAML_LOADER)
+    except Exception as e:
+        logger.error(f"Error loading config {config_path}: {e}")
+        raise
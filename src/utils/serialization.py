@@ -0,0 +1,72 @@
+import os
+import pickle
+import struct
+import logging
+import xgboost as xgb
+
+logger = logging.getLogger(__name__)
+
+# Each out-of-band buffer is stored as an 8-byte little-endian length
+# followed by the raw bytes
+_LENGTH = struct.Struct("<Q")
+
+
+def buffers_path(path: str) -> str:
+    """Sidecar file holding the out-of-band buffers of the pickle at `path`."""
+    return os.path.splitext(path)[0] + ".buffers"
+
+
+def save_artifact(obj, path: str):
+    """
+    Pickle `obj` with protocol 5, writing large buffers (e.g. numpy arrays)
+    out-of-band to a sibling .buffers file instead of copying them into the
+    pickle stream.
+    """
+    sidecar = buffers_path(path)
+    with open(path, "wb") as f, open(sidecar, "wb") as buf_file:
+        def write_buffer(buf: pickle.PickleBuffer):
+            raw = buf.raw()
+            buf_file.write(_LENGTH.pack(raw.nbytes))
+            buf_file.write(raw)
+
+        pickle.Pickler(f, protocol=5, buffer_callback=write_buffer).dump(obj)
+
+
+def load_artifact(path: str):
+    """
+    Load an artifact written by save_artifact(). Falls back to a plain
+    pickle.load() when there is no .buffers sidecar (older artifacts).
+    """
+    sidecar = buffers_path(path)
+    buffers = []
+    size = os.path.getsize(sidecar) if os.path.exists(sidecar) else None
+    if size:
+        # Read the sidecar once into a writable buffer and hand out slices,
+        # so arrays are rebuilt on top of it without further copies
+        data = bytearray(size)
+        with open(sidecar, "rb") as buf_file:
+            buf_file.readinto(data)
+        view = memoryview(data)
+        offset = 0
+        while offset < len(view):
+            (n,) = _LENGTH.unpack_from(view, offset)
+            offset += _LENGTH.size
+            buffers.append(pickle.PickleBuffer(view[offset:offset + n]))
+            offset += n
+    elif size is None:
+        logger.debug(f"No out-of-band buffers for {path}")
+
+    with open(path, "rb") as f:
+        return pickle.Unpickler(f, buffers=buffers).load()
+
+
+def load_xgboost_model(path: str) -> xgb.XGBClassifier:
+    """
+    Load an XGBClassifier saved with save_model() (native JSON/UBJ format).
+    The file is read here so a missing model raises FileNotFoundError.
+    """
+    with open(path, "rb") as f:
+        raw = bytearray(f.read())
+    model = xgb.XGBClassifier()
+    model.load_model(raw)
+    return model
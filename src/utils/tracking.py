@@ -0,0 +1,28 @@
+import os
+import contextlib
+import importlib
+
+
+def mlflow_enabled() -> bool:
+    """MLflow tracking is on unless MLFLOW_DISABLED=1 (set by the test suite)."""
+    return os.environ.get("MLFLOW_DISABLED") != "1"
+
+
+def mlflow_call(name: str, *args, **kwargs):
+    """
+    Call `mlflow.<name>` (e.g. "log_metrics" or "xgboost.log_model") when
+    tracking is enabled; otherwise do nothing. mlflow is only imported on
+    first use, so disabled runs never touch it or the mlruns/ directory.
+    """
+    if not mlflow_enabled():
+        return None
+    module_name, _, fn_name = name.rpartition(".")
+    module = importlib.import_module("mlflow." + module_name if module_name else "mlflow")
+    return getattr(module, fn_name)(*args, **kwargs)
+
+
+def start_run(run_name: str):
+    """mlflow.start_run() context, or a no-op context when tracking is disabled."""
+    if not mlflow_enabled():
+        return contextlib.nullcontext()
+    return mlflow_call("start_run", run_name=run_name)
@@ -1,5 +1,6 @@
 import pytest
 import pandas as pd
+import yaml
 import numpy as np
 import os
 import sys
@@ -9,6 +10,9 @@ from pathlib import Path
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
+# Keep pipeline code from creating MLflow runs under mlruns/ during tests
+os.environ["MLFLOW_DISABLED"] = "1"
+
 @pytest.fixture
 def sample_raw_data():
     """Sample raw data matching AI4I dataset structure."""
@@ -54,14 +58,26 @@ def sample_feature_input():
         'tool_wear': [10, 50, 100]
     })
 
+@pytest.fixture
+def real_config(tmp_path, sample_raw_data):
+    """Config file on disk whose raw_path is a real mini AI4I CSV in tmp_path."""
+    raw_csv = tmp_path / "raw.csv"
+    sample_raw_data.to_csv(raw_csv, index=False)
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text(yaml.safe_dump({
+        'data': {'raw_path': str(raw_csv), 'dataset_url': raw_csv.as_uri()}
+    }))
+    return str(config_path)
+
 @pytest.fixture
 def mock_config():
     """Mock configuration dictionary."""
     return {
         'data': {
             'raw_path': 'data/raw/ai4i2020.csv',
-            'processed_train_path': 'data/processed/train.csv',
-            'processed_test_path': 'data/processed/test.csv',
+            'processed_train_path': 'data/processed/train.parquet',
+            'processed_test_path': 'data/processed/test.parquet',
+            'failure_types_path': 'data/processed/failure_types.parquet',
             'dataset_url': 'https://raw.githubusercontent.com/example/dataset.csv'
         },
         'training': {
@@ -78,9 +94,28 @@ def mock_config():
         }
     }
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def api_client():
-    """FastAPI test client."""
+    """
+    FastAPI test client shared by the whole session. Entering it runs the
+    app lifespan once (model loading, warm-up, batcher start-up).
+    """
     from fastapi.testclient import TestClient
     from api.main import app
-    return TestClient(app)
+    with TestClient(app) as client:
+        yield client
+
+@pytest.fixture(scope="session")
+def real_artifacts():
+    """
+    Trained (model, engineer) from models/, loaded once for the session.
+    Tests needing them are skipped when the training pipeline hasn't run.
+    """
+    from src.utils.serialization import load_artifact, load_xgboost_model
+    model_path = project_root / "models" / "xgboost_model.ubj"
+    engineer_path = project_root / "models" / "feature_engineer.pkl"
+    
+    if not model_path.exists() or not engineer_path.exists():
+        pytest.skip("Models not found. Run training_pipeline.py first.")
+    
+    return load_xgboost_model(model_path), load_artifact(engineer_path)
@@ -1,8 +1,9 @@
+import asyncio
+import threading
 import pytest
-from fastapi.testclient import TestClient
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import patch, MagicMock
-import pickle
-from api.main import app
 from api.schemas import MachineData
 
 
@@ -77,19 +78,9 @@ class TestAPIEndpoints:
         mock_engineer = MagicMock()
         mock_model = MagicMock()
         
-        # Mock transform to return a DataFrame with expected columns
-        import pandas as pd
-        mock_engineer.transform.return_value = pd.DataFrame({
-            'type': [1],
-            'air_temperature': [300.0],
-            'process_temperature': [310.0],
-            'rotational_speed': [1500],
-            'torque': [40.0],
-            'tool_wear': [10],
-            'temp_difference': [10.0],
-            'power_factor': [60000.0],
-            'strain_wear_product': [400.0]
-        })
+        # Mock the array fast paths the endpoints use (one feature vector per row)
+        mock_engineer.transform_row.return_value = np.zeros(9, dtype=np.float32)
+        mock_engineer.transform_rows.side_effect = lambda rows: np.zeros((len(rows), 9), dtype=np.float32)
         
         # NEW: Mock feature_names_ attribute to match expected features
         mock_engineer.feature_names_ = [
@@ -107,11 +98,9 @@ class TestAPIEndpoints:
             'model': mock_model
         }
     
-    def test_predict_endpoint_success(self, mock_models):
+    def test_predict_endpoint_success(self, api_client, mock_models):
         """Test /predict endpoint with valid data."""
         with patch('api.main.models', mock_models):
-            client = TestClient(app)
-            
             payload = {
                 "air_temperature": 300.0,
                 "process_temperature": 310.0,
@@ -121,7 +110,7 @@ class TestAPIEndpoints:
                 "type": "M"
             }
             
-            response = client.post("/predict", json=payload)
+            response = api_client.post("/predict", json=payload)
             
             assert response.status_code == 200
             data = response.json()
@@ -129,26 +118,53 @@ class TestAPIEndpoints:
             assert "probability" in data
             assert data["prediction"] in [0, 1]
             assert 0 <= data["probability"] <= 1
+            
+            # The engineered row reaches the model as a (1, n_features) array
+            mock_models['feature_engineer'].transform_row.assert_called_once_with(payload)
+            (X,), _ = mock_models['model'].predict_proba.call_args
+            assert X.shape == (1, 9)
     
-    def test_predict_endpoint_invalid_schema(self, mock_models):
-        """Test /predict endpoint with invalid schema."""
+    def test_predict_endpoint_accepts_integral_floats(self, api_client, mock_models):
+        """Test that int fields accept 1500.0 but reject 1500.5, like Pydantic's lax mode."""
+        payload = {
+            "air_temperature": 300.0,
+            "process_temperature": 310.0,
+            "rotational_speed": 1500.0,
+            "torque": 40.0,
+            "tool_wear": 10,
+            "type": "M"
+        }
+        
         with patch('api.main.models', mock_models):
-            client = TestClient(app)
+            response = api_client.post("/predict", json=payload)
+            assert response.status_code == 200
+            row = mock_models['feature_engineer'].transform_row.call_args.args[0]
+            assert row["rotational_speed"] == 1500 and isinstance(row["rotational_speed"], int)
             
+            response = api_client.post("/predict_batch", json=[payload])
+            assert response.status_code == 200
+            
+            response = api_client.post("/predict", json={**payload, "rotational_speed": 1500.5})
+            assert response.status_code == 422
+            
+            response = api_client.post("/predict_batch", json=[{**payload, "tool_wear": 10.5}])
+            assert response.status_code == 422
+    
+    def test_predict_endpoint_invalid_schema(self, api_client, mock_models):
+        """Test /predict endpoint with invalid schema."""
+        with patch('api.main.models', mock_models):
             payload = {
                 "air_temperature": 300.0,
                 # Missing required fields
             }
             
-            response = client.post("/predict", json=payload)
+            response = api_client.post("/predict", json=payload)
             
             assert response.status_code == 422  # Validation error
     
-    def test_predict_endpoint_invalid_type_value(self, mock_models):
+    def test_predict_endpoint_invalid_type_value(self, api_client, mock_models):
         """Test /predict endpoint with invalid type value."""
         with patch('api.main.models', mock_models):
-            client = TestClient(app)
-            
             payload = {
                 "air_temperature": 300.0,
                 "process_temperature": 310.0,
@@ -158,15 +174,31 @@ class TestAPIEndpoints:
                 "type": "Z"  # Invalid
             }
             
-            response = client.post("/predict", json=payload)
+            response = api_client.post("/predict", json=payload)
+            
+            assert response.status_code == 422
+    
+    def test_predict_endpoint_wrong_field_types(self, api_client, mock_models):
+        """Test /predict endpoint rejects wrong field types and malformed JSON."""
+        with patch('api.main.models', mock_models):
+            payload = {
+                "air_temperature": "not a number",
+                "process_temperature": 310.0,
+                "rotational_speed": 1500,
+                "torque": 40.0,
+                "tool_wear": 10,
+                "type": "M"
+            }
+            
+            response = api_client.post("/predict", json=payload)
+            assert response.status_code == 422
             
+            response = api_client.post("/predict", content=b"{not json", headers={"Content-Type": "application/json"})
             assert response.status_code == 422
     
-    def test_predict_endpoint_models_not_loaded(self):
+    def test_predict_endpoint_models_not_loaded(self, api_client):
         """Test /predict endpoint when models are not loaded."""
         with patch('api.main.models', {}):
-            client = TestClient(app)
-            
             payload = {
                 "air_temperature": 300.0,
                 "process_temperature": 310.0,
@@ -176,18 +208,16 @@ class TestAPIEndpoints:
                 "type": "M"
             }
             
-            response = client.post("/predict", json=payload)
+            response = api_client.post("/predict", json=payload)
             
             assert response.status_code == 503  # Service unavailable
     
-    def test_predict_endpoint_prediction_error(self, mock_models):
+    def test_predict_endpoint_prediction_error(self, api_client, mock_models):
         """Test /predict endpoint handles prediction errors."""
-        # Make model.predict raise an exception
-        mock_models['model'].predict.side_effect = Exception("Prediction failed")
+        # Make model.predict_proba raise an exception
+        mock_models['model'].predict_proba.side_effect = Exception("Prediction failed")
         
         with patch('api.main.models', mock_models):
-            client = TestClient(app)
-            
             payload = {
                 "air_temperature": 300.0,
                 "process_temperature": 310.0,
@@ -197,15 +227,13 @@ class TestAPIEndpoints:
                 "type": "M"
             }
             
-            response = client.post("/predict", json=payload)
+            response = api_client.post("/predict", json=payload)
             
             assert response.status_code == 500
     
-    def test_predict_endpoint_returns_correct_format(self, mock_models):
+    def test_predict_endpoint_returns_correct_format(self, api_client, mock_models):
         """Test that /predict endpoint returns expected format."""
         with patch('api.main.models', mock_models):
-            client = TestClient(app)
-            
             payload = {
                 "air_temperature": 300.0,
                 "process_temperature": 310.0,
@@ -215,7 +243,7 @@ class TestAPIEndpoints:
                 "type": "L"
             }
             
-            response = client.post("/predict", json=payload)
+            response = api_client.post("/predict", json=payload)
             
             assert response.status_code == 200
             data = response.json()
@@ -224,15 +252,13 @@ class TestAPIEndpoints:
             assert isinstance(data["prediction"], int)
             assert isinstance(data["probability"], float)
     
-    def test_predict_endpoint_failure_prediction(self, mock_models):
+    def test_predict_endpoint_failure_prediction(self, api_client, mock_models):
         """Test /predict endpoint with failure prediction."""
         # Mock a failure prediction
         mock_models['model'].predict.return_value = [1]
         mock_models['model'].predict_proba.return_value = [[0.2, 0.8]]
         
         with patch('api.main.models', mock_models):
-            client = TestClient(app)
-            
             payload = {
                 "air_temperature": 300.0,
                 "process_temperature": 320.0,  # High temp
@@ -242,9 +268,298 @@ class TestAPIEndpoints:
                 "type": "H"
             }
             
-            response = client.post("/predict", json=payload)
+            response = api_client.post("/predict", json=payload)
             
             assert response.status_code == 200
             data = response.json()
             assert data["prediction"] == 1
             assert data["probability"] == 0.8
+
+    def test_predict_batch_endpoint(self, api_client):
+        """Test /predict_batch scores many records in one model call."""
+        from src.features.feature_engineering import FeatureEngineer
+        
+        mock_model = MagicMock()
+        mock_model.predict_proba.side_effect = lambda X: np.tile([0.3, 0.7], (len(X), 1))
+        models_dict = {'feature_engineer': FeatureEngineer(), 'model': mock_model}
+        payload = {
+            "air_temperature": 300.0,
+            "process_temperature": 310.0,
+            "rotational_speed": 1500,
+            "torque": 40.0,
+            "tool_wear": 10,
+            "type": "M"
+        }
+        
+        with patch('api.main.models', models_dict):
+            response = api_client.post("/predict_batch", json=[payload] * 128)
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data) == 128
+        assert all(r == {"prediction": 1, "probability": 0.7} for r in data)
+        mock_model.predict_proba.assert_called_once()
+    
+    def test_predict_batch_endpoint_validation(self, api_client, mock_models):
+        """Test /predict_batch rejects invalid records and accepts an empty list."""
+        with patch('api.main.models', mock_models):
+            response = api_client.post("/predict_batch", json=[{"air_temperature": 300.0}])
+            assert response.status_code == 422
+            
+            response = api_client.post("/predict_batch", json=[])
+            assert response.status_code == 200
+            assert response.json() == []
+    
+    def test_predict_endpoint_uses_model_threshold(self, api_client, mock_models):
+        """Test that the class is derived from predict_proba and the stored threshold."""
+        mock_models['threshold'] = 0.01
+
+        with patch('api.main.models', mock_models):
+            payload = {
+                "air_temperature": 300.0,
+                "process_temperature": 310.0,
+                "rotational_speed": 1500,
+                "torque": 40.0,
+                "tool_wear": 10,
+                "type": "M"
+            }
+
+            response = api_client.post("/predict", json=payload)
+
+            assert response.status_code == 200
+            assert response.json()["prediction"] == 1
+            mock_models['model'].predict.assert_not_called()
+
+
+class TestPredictionBatcher:
+    """Tests for request coalescing in the prediction batcher."""
+    
+    def test_concurrent_requests_share_one_batch(self):
+        """Test that requests submitted together are scored in a single call."""
+        from api.batching import PredictionBatcher
+        
+        calls = []
+        
+        def score_fn(rows):
+            calls.append(len(rows))
+            return [{"prediction": 0, "probability": row["value"]} for row in rows]
+        
+        async def run():
+            batcher = PredictionBatcher(score_fn, max_batch_size=8, max_wait_ms=50)
+            batcher.start()
+            try:
+                return await asyncio.gather(*[batcher.submit({"value": i / 10}) for i in range(5)])
+            finally:
+                await batcher.stop()
+        
+        results = asyncio.run(run())
+        
+        assert calls == [5]
+        assert [r["probability"] for r in results] == [0.0, 0.1, 0.2, 0.3, 0.4]
+    
+    def test_batch_error_propagates_to_every_request(self):
+        """Test that a failing batch rejects all awaiting requests."""
+        from api.batching import PredictionBatcher
+        
+        def score_fn(rows):
+            raise ValueError("boom")
+        
+        async def run():
+            batcher = PredictionBatcher(score_fn, max_batch_size=8, max_wait_ms=50)
+            batcher.start()
+            try:
+                return await asyncio.gather(
+                    *[batcher.submit({}) for _ in range(3)], return_exceptions=True
+                )
+            finally:
+                await batcher.stop()
+        
+        results = asyncio.run(run())
+        
+        assert len(results) == 3
+        assert all(isinstance(r, ValueError) for r in results)
+
+    def test_stop_fails_requests_being_collected(self):
+        """Test that stop() during the wait window fails the batch being collected."""
+        from api.batching import PredictionBatcher
+        
+        def score_fn(rows):
+            return [{} for _ in rows]
+        
+        async def run():
+            batcher = PredictionBatcher(score_fn, max_batch_size=8, max_wait_ms=500)
+            batcher.start()
+            request = asyncio.create_task(batcher.submit({}))
+            # Let the worker take the request off the queue and start waiting
+            await asyncio.sleep(0.05)
+            await batcher.stop()
+            return await asyncio.wait_for(asyncio.gather(request, return_exceptions=True), 1)
+        
+        (result,) = asyncio.run(run())
+        
+        assert isinstance(result, RuntimeError)
+
+    def test_batches_are_scored_off_the_event_loop(self):
+        """Test that score_fn runs in the executor, not on the event loop thread."""
+        from api.batching import PredictionBatcher
+
+        threads = []
+
+        def score_fn(rows):
+            threads.append(threading.current_thread().name)
+            return [{} for _ in rows]
+
+        async def run():
+            with ThreadPoolExecutor(max_workers=2, thread_name_prefix="scoring") as executor:
+                batcher = PredictionBatcher(score_fn, max_batch_size=8, max_wait_ms=50, executor=executor)
+                batcher.start()
+                try:
+                    await batcher.submit({})
+                finally:
+                    await batcher.stop()
+
+        asyncio.run(run())
+
+        assert len(threads) == 1
+        assert threads[0].startswith("scoring")
+
+    def test_predict_many_splits_probabilities_per_row(self):
+        """Test that a batched predict_proba result is split back per request."""
+        from api.main import predict_many
+        from src.features.feature_engineering import FeatureEngineer
+        
+        mock_model = MagicMock()
+        mock_model.predict_proba.return_value = [[0.9, 0.1], [0.3, 0.7]]
+        payload = {
+            "air_temperature": 300.0,
+            "process_temperature": 310.0,
+            "rotational_speed": 1500,
+            "torque": 40.0,
+            "tool_wear": 10,
+            "type": "M"
+        }
+        
+        with patch('api.main.models', {'feature_engineer': FeatureEngineer(), 'model': mock_model}):
+            results = predict_many([payload, {**payload, "type": "H"}])
+        
+        mock_model.predict_proba.assert_called_once()
+        assert results == [
+            {"prediction": 0, "probability": 0.1},
+            {"prediction": 1, "probability": 0.7}
+        ]
+
+
+class TestCompiledPredictor:
+    """Tests for the optional Treelite/TL2cgen predictor."""
+    
+    def test_falls_back_when_tl2cgen_missing(self, tmp_path):
+        """Test that no compiled predictor is returned without TL2cgen."""
+        from api.compiled_predictor import load_compiled_predictor
+        
+        with patch('api.compiled_predictor.tl2cgen', None):
+            predictor = load_compiled_predictor(MagicMock(), str(tmp_path / "predictor.so"))
+        
+        assert predictor is None
+    
+    def test_falls_back_when_compilation_fails(self, tmp_path):
+        """Test that compilation errors do not prevent the API from starting."""
+        from api.compiled_predictor import load_compiled_predictor
+        
+        mock_tl2cgen = MagicMock()
+        mock_tl2cgen.export_lib.side_effect = RuntimeError("no toolchain")
+        
+        with patch('api.compiled_predictor.tl2cgen', mock_tl2cgen), \
+             patch('api.compiled_predictor.treelite', MagicMock()):
+            predictor = load_compiled_predictor(MagicMock(), str(tmp_path / "predictor.so"))
+        
+        assert predictor is None
+        # The temporary build file is cleaned up
+        assert list(tmp_path.iterdir()) == []
+    
+    def test_compiled_library_is_renamed_into_place(self, tmp_path):
+        """Test that the library is built under a temp name and then moved to libpath."""
+        from api.compiled_predictor import load_compiled_predictor
+        
+        built = []
+        
+        def export_lib(tl_model, toolchain, libpath, params):
+            built.append(libpath)
+            with open(libpath, "wb") as f:
+                f.write(b"lib")
+        
+        mock_tl2cgen = MagicMock()
+        mock_tl2cgen.export_lib.side_effect = export_lib
+        libpath = tmp_path / "predictor.so"
+        
+        with patch('api.compiled_predictor.tl2cgen', mock_tl2cgen), \
+             patch('api.compiled_predictor.treelite', MagicMock()):
+            predictor = load_compiled_predictor(MagicMock(), str(libpath))
+        
+        assert predictor is mock_tl2cgen.Predictor.return_value
+        assert built[0] != str(libpath)
+        assert libpath.read_bytes() == b"lib"
+        assert list(tmp_path.iterdir()) == [libpath]
+
+
+class TestFeatureOrderVerification:
+    """Tests for the startup check of the fitted feature order."""
+
+    def test_matching_engineer_keeps_models(self):
+        """Test that a correctly fitted engineer leaves the models loaded."""
+        from api.main import verify_feature_order
+        from src.features.feature_engineering import FEATURE_ORDER
+
+        engineer = MagicMock()
+        engineer.feature_names_ = list(FEATURE_ORDER)
+        loaded = {'feature_engineer': engineer, 'model': MagicMock()}
+
+        with patch('api.main.models', loaded):
+            verify_feature_order()
+
+        assert 'model' in loaded
+
+    def test_mismatched_engineer_disables_predictions(self):
+        """Test that a feature order mismatch unloads the model so /predict returns 503."""
+        from api.main import verify_feature_order
+        from src.features.feature_engineering import FEATURE_ORDER
+
+        engineer = MagicMock()
+        engineer.feature_names_ = list(reversed(FEATURE_ORDER))
+        loaded = {'feature_engineer': engineer, 'model': MagicMock()}
+
+        with patch('api.main.models', loaded):
+            verify_feature_order()
+
+        assert 'model' not in loaded
+        assert "Feature mismatch" in loaded['startup_error']
+
+    def test_mismatch_reason_is_returned_by_predict(self, api_client):
+        """Test that /predict's 503 names the feature order mismatch found at startup."""
+        loaded = {'feature_engineer': MagicMock(), 'startup_error': "Feature mismatch between training and inference"}
+        payload = {
+            "air_temperature": 300.0,
+            "process_temperature": 310.0,
+            "rotational_speed": 1500,
+            "torque": 40.0,
+            "tool_wear": 10,
+            "type": "M"
+        }
+
+        with patch('api.main.models', loaded):
+            response = api_client.post("/predict", json=payload)
+
+        assert response.status_code == 503
+        assert response.json()["detail"] == loaded['startup_error']
+
+    def test_check_feature_order_raises_value_error(self):
+        """Test that check_feature_order reports a mismatch as ValueError, not an HTTP error."""
+        from api.main import check_feature_order
+        from src.features.feature_engineering import FEATURE_ORDER
+
+        engineer = MagicMock()
+        engineer.feature_names_ = list(FEATURE_ORDER)
+
+        with patch('api.main.models', {'feature_engineer': engineer}):
+            check_feature_order(tuple(FEATURE_ORDER))
+            with pytest.raises(ValueError, match="Feature mismatch"):
+                check_feature_order(tuple(reversed(FEATURE_ORDER)))
@@ -1,26 +1,55 @@
 import pytest
 import pandas as pd
-from unittest.mock import patch, MagicMock
+import yaml
 from src.data.ingestion import load_config, ingest_data
 
 
 class TestLoadConfig:
     """Tests for load_config function."""
     
-    @patch('builtins.open', new_callable=MagicMock)
-    @patch('yaml.safe_load')
-    def test_load_config_success(self, mock_yaml_load, mock_file):
+    @pytest.fixture(autouse=True)
+    def clear_config_cache(self):
+        """Start every test with an empty load_config cache."""
+        load_config.cache_clear()
+        yield
+        load_config.cache_clear()
+    
+    def test_load_config_success(self, tmp_path):
         """Test successful config loading."""
         expected_config = {
             'data': {'raw_path': 'data/raw/test.csv'},
             'training': {'test_size': 0.2}
         }
-        mock_yaml_load.return_value = expected_config
+        config_path = tmp_path / "test_config.yaml"
+        config_path.write_text(yaml.safe_dump(expected_config))
         
-        result = load_config("test_config.yaml")
+        result = load_config(str(config_path))
         
         assert result == expected_config
     
+    def test_load_config_is_cached(self, tmp_path):
+        """Test that the YAML file is parsed only once per path."""
+        config_path = tmp_path / "test_config.yaml"
+        config_path.write_text(yaml.safe_dump({'data': {}}))
+        
+        first = load_config(str(config_path))
+        # Later edits are not re-read within the same process
+        config_path.write_text(yaml.safe_dump({'data': {'raw_path': 'changed.csv'}}))
+        second = load_config(str(config_path))
+        
+        assert first is second
+        assert second == {'data': {}}
+    
+    def test_load_config_shared_by_pipeline_stages(self):
+        """Test that every stage uses the one cached loader from src.utils.config."""
+        from src.utils import config
+        from src.data import preprocessing
+        from src.pipelines import training_pipeline, evaluation_pipeline
+        
+        for module in (preprocessing, training_pipeline, evaluation_pipeline):
+            assert module.load_config is config.load_config
+        assert load_config is config.load_config
+    
     def test_load_config_file_not_found(self):
         """Test that load_config raises exception when file not found."""
         with pytest.raises(Exception):
@@ -28,91 +57,59 @@ class TestLoadConfig:
 
 
 class TestIngestData:
-    """Tests for ingest_data function."""
+    """Tests for ingest_data function (real files in tmp_path, no mocks)."""
     
-    @patch('src.data.ingestion.load_config')
-    @patch('os.path.exists')
-    @patch('os.makedirs')
-    @patch('pandas.read_csv')
-    def test_ingest_loads_existing_file(
-        self, 
-        mock_read_csv, 
-        mock_makedirs, 
-        mock_exists, 
-        mock_load_config,
-        sample_raw_data
-    ):
+    def test_ingest_loads_existing_file(self, real_config, sample_raw_data):
         """Test that ingest_data loads file when it exists."""
-        mock_load_config.return_value = {
-            'data': {
-                'raw_path': 'data/raw/test.csv',
-                'dataset_url': 'http://example.com/data.csv'
-            }
-        }
-        mock_exists.return_value = True
-        mock_read_csv.return_value = sample_raw_data
-        
-        result = ingest_data("test_config.yaml")
+        result = ingest_data(real_config)
         
         assert isinstance(result, pd.DataFrame)
         assert result.shape == sample_raw_data.shape
-        mock_read_csv.assert_called_once_with('data/raw/test.csv')
+        pd.testing.assert_frame_equal(result, sample_raw_data, check_dtype=False)
     
-    @patch('src.data.ingestion.load_config')
-    @patch('os.path.exists')
-    @patch('os.makedirs')
-    @patch('pandas.read_csv')
-    def test_ingest_downloads_missing_file(
-        self, 
-        mock_read_csv, 
-        mock_makedirs, 
-        mock_exists, 
-        mock_load_config,
-        sample_raw_data
-    ):
+    def test_ingest_downloads_missing_file(self, tmp_path, real_config, sample_raw_data):
         """Test that ingest_data downloads file when it doesn't exist."""
-        mock_load_config.return_value = {
-            'data': {
-                'raw_path': 'data/raw/test.csv',
-                'dataset_url': 'http://example.com/data.csv'
-            }
-        }
-        mock_exists.return_value = False
-        mock_read_csv.return_value = sample_raw_data
+        # Reuse the fixture's CSV as the download source (file:// URL)
+        source_url = load_config(real_config)['data']['dataset_url']
+        raw_path = tmp_path / "download" / "raw.csv"
+        config_path = tmp_path / "download_config.yaml"
+        config_path.write_text(yaml.safe_dump({
+            'data': {'raw_path': str(raw_path), 'dataset_url': source_url}
+        }))
         
-        with patch.object(pd.DataFrame, 'to_csv'):
-            result = ingest_data("test_config.yaml")
+        result = ingest_data(str(config_path))
         
-        # Should have called read_csv with URL
-        assert mock_read_csv.call_count == 1
-        call_args = mock_read_csv.call_args[0][0]
-        assert 'http://' in call_args or call_args == 'data/raw/test.csv'
+        # Should have downloaded the URL to the raw path, then parsed it
+        assert raw_path.exists()
+        assert result.shape == sample_raw_data.shape
+        assert list(raw_path.parent.iterdir()) == [raw_path]
     
-    @patch('src.data.ingestion.load_config')
-    @patch('os.path.exists')
-    @patch('os.makedirs')
-    @patch('pandas.read_csv')
-    def test_ingest_validates_columns(
-        self, 
-        mock_read_csv, 
-        mock_makedirs, 
-        mock_exists, 
-        mock_load_config,
-        sample_raw_data
-    ):
-        """Test that column validation is performed."""
-        mock_load_config.return_value = {
-            'data': {
-                'raw_path': 'data/raw/test.csv',
-                'dataset_url': 'http://example.com/data.csv'
-            }
-        }
-        mock_exists.return_value = True
-        mock_read_csv.return_value = sample_raw_data
+    def test_ingest_failed_download_leaves_no_file(self, tmp_path):
+        """Test that a failed download leaves neither the raw file nor a partial temp file."""
+        raw_path = tmp_path / "download" / "raw.csv"
+        config_path = tmp_path / "download_config.yaml"
+        config_path.write_text(yaml.safe_dump({
+            'data': {'raw_path': str(raw_path), 'dataset_url': (tmp_path / "missing.csv").as_uri()}
+        }))
         
-        result = ingest_data("test_config.yaml")
+        with pytest.raises(Exception):
+            ingest_data(str(config_path))
+        
+        assert list(raw_path.parent.iterdir()) == []
+    
+    def test_ingest_validates_columns(self, real_config):
+        """Test that column validation is performed."""
+        result = ingest_data(real_config)
         
         # Verify all expected columns are present
         expected_cols = ['UDI', 'Product ID', 'Type', 'Air temperature [K]']
         for col in expected_cols:
             assert col in result.columns
+    
+    def test_ingest_applies_raw_schema(self, real_config):
+        """Test that the explicit Arrow schema sets compact dtypes."""
+        result = ingest_data(real_config)
+        
+        assert result['Rotational speed [rpm]'].dtype == 'int32'
+        assert result['Machine failure'].dtype == 'int8'
+        assert result['Torque [Nm]'].dtype == 'float64'
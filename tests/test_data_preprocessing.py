@@ -1,7 +1,7 @@
 import pytest
 import pandas as pd
 from unittest.mock import patch, mock_open
-from src.data.preprocessing import clean_column_names, preprocess_and_split, load_config
+from src.data.preprocessing import clean_column_names, preprocess_and_split, load_config, read_processed
 
 
 class TestCleanColumnNames:
@@ -69,7 +69,7 @@ class TestDataPreprocessing:
     
     @patch('src.data.preprocessing.load_config')
     @patch('src.data.preprocessing.pd.read_csv')
-    @patch('src.data.preprocessing.train_test_split')
+    @patch('src.data.preprocessing.StratifiedShuffleSplit')
     @patch('os.path.exists')
     @patch('os.makedirs')
     def test_preprocess_and_split_basic_flow(
@@ -86,8 +86,9 @@ class TestDataPreprocessing:
         mock_load_config.return_value = {
             'data': {
                 'raw_path': 'data/raw/test.csv',
-                'processed_train_path': 'data/processed/train.csv',
-                'processed_test_path': 'data/processed/test.csv'
+                'processed_train_path': 'data/processed/train.parquet',
+                'processed_test_path': 'data/processed/test.parquet',
+                'failure_types_path': 'data/processed/failure_types.parquet'
             },
             'training': {
                 'test_size': 0.2,
@@ -97,13 +98,11 @@ class TestDataPreprocessing:
         mock_exists.return_value = True
         mock_read_csv.return_value = sample_raw_data
         
-        # Create split data
-        train_df = sample_raw_data.iloc[:4]
-        test_df = sample_raw_data.iloc[4:]
-        mock_split.return_value = (train_df, test_df)
+        # Create split indices
+        mock_split.return_value.split.return_value = iter([([0, 1, 2, 3], [4])])
         
         # Run function
-        with patch.object(pd.DataFrame, 'to_csv'):
+        with patch.object(pd.DataFrame, 'to_parquet') as mock_to_parquet:
             preprocess_and_split()
         
         # Verify config was loaded
@@ -111,6 +110,58 @@ class TestDataPreprocessing:
         
         # Verify data was read
         mock_read_csv.assert_called_once()
+        
+        # Verify both splits and the failure types sidecar were written as Parquet
+        assert mock_to_parquet.call_count == 3
+    
+    @patch('src.data.preprocessing.load_config')
+    @patch('src.data.preprocessing.pd.read_csv')
+    @patch('os.path.exists')
+    def test_failure_types_moved_to_sidecar(self, mock_exists, mock_read_csv, mock_load_config,
+                                            sample_raw_data, tmp_path):
+        """Test that failure type columns are written to the sidecar, not the splits."""
+        paths = {
+            'raw_path': 'data/raw/test.csv',
+            'processed_train_path': str(tmp_path / 'train.parquet'),
+            'processed_test_path': str(tmp_path / 'test.parquet'),
+            'failure_types_path': str(tmp_path / 'failure_types.parquet')
+        }
+        mock_load_config.return_value = {
+            'data': paths,
+            'training': {'test_size': 0.4, 'random_state': 42}
+        }
+        mock_exists.return_value = True
+        # Enough rows of each class for a stratified split
+        raw = pd.concat([sample_raw_data] * 2, ignore_index=True)
+        raw['UDI'] = range(1, len(raw) + 1)
+        mock_read_csv.return_value = raw
+        
+        preprocess_and_split()
+        
+        train = pd.read_parquet(paths['processed_train_path'])
+        failure_types = pd.read_parquet(paths['failure_types_path'])
+        
+        assert not {'product_id', 'twf', 'hdf', 'pwf', 'osf', 'rnf'} & set(train.columns)
+        assert list(failure_types.columns) == ['udi', 'machine_failure', 'twf', 'hdf', 'pwf', 'osf', 'rnf']
+        assert len(failure_types) == 10
+        
+        # Splits are stored with the explicit processed dtypes
+        assert isinstance(train['type'].dtype, pd.CategoricalDtype)
+        assert train['rotational_speed'].dtype == 'int32'
+        assert train['tool_wear'].dtype == 'int32'
+        assert train['machine_failure'].dtype == 'int8'
+        assert train['air_temperature'].dtype == 'float64'
+        
+        # Each split joins back to its failure types on udi
+        test = pd.read_parquet(paths['processed_test_path'])
+        for split in (train, test):
+            joined = split.merge(failure_types, on='udi', how='left', suffixes=('', '_sidecar'),
+                                 validate='one_to_one')
+            assert len(joined) == len(split)
+            assert joined['twf'].notna().all()
+            assert (joined['machine_failure'] == joined['machine_failure_sidecar']).all()
+        assert set(train['udi']).isdisjoint(test['udi'])
+        assert len(train) + len(test) == len(failure_types)
     
     def test_load_config_file_not_found(self):
         """Test that load_config raises error when file not found."""
@@ -124,8 +175,9 @@ class TestDataPreprocessing:
         mock_load_config.return_value = {
             'data': {
                 'raw_path': 'data/raw/missing.csv',
-                'processed_train_path': 'data/processed/train.csv',
-                'processed_test_path': 'data/processed/test.csv'
+                'processed_train_path': 'data/processed/train.parquet',
+                'processed_test_path': 'data/processed/test.parquet',
+                'failure_types_path': 'data/processed/failure_types.parquet'
             },
             'training': {
                 'test_size': 0.2,
@@ -143,3 +195,23 @@ class TestDataPreprocessing:
         result = clean_column_names(sample_raw_data)
         
         assert result.shape == original_shape
+    
+    def test_read_processed_parquet_and_csv(self, sample_processed_data, tmp_path):
+        """Test that Parquet splits are read as-is and legacy CSV splits get the same dtypes."""
+        parquet_path = tmp_path / 'train.parquet'
+        csv_path = tmp_path / 'train.csv'
+        sample_processed_data.to_parquet(parquet_path, index=False)
+        sample_processed_data.to_csv(csv_path, index=False)
+        
+        from_parquet = read_processed(str(parquet_path))
+        from_csv = read_processed(str(csv_path))
+        
+        pd.testing.assert_frame_equal(from_parquet, sample_processed_data)
+        assert isinstance(from_csv['type'].dtype, pd.CategoricalDtype)
+        assert from_csv['tool_wear'].dtype == 'int32'
+        assert from_csv['type'].tolist() == sample_processed_data['type'].tolist()
+        
+        # Column projection works for both formats
+        for path in (parquet_path, csv_path):
+            subset = read_processed(str(path), columns=['type', 'machine_failure'])
+            assert list(subset.columns) == ['type', 'machine_failure']
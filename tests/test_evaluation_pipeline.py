@@ -0,0 +1,91 @@
+import os
+import pytest
+import numpy as np
+import xgboost as xgb
+from unittest.mock import patch
+from sklearn.metrics import confusion_matrix, precision_score, recall_score, f1_score
+from src.pipelines import evaluation_pipeline
+from src.pipelines.evaluation_pipeline import (
+    DMATRIX_CACHE_PREFIX, dmatrix_cache_path, get_cached_dmatrix,
+    binary_confusion_matrix, binary_metrics
+)
+
+
+def _sklearn_metrics(y_true, y_pred):
+    """Reference metrics for the failure class, computed by sklearn."""
+    return {
+        "test_f1": f1_score(y_true, y_pred, zero_division=0),
+        "test_recall": recall_score(y_true, y_pred, zero_division=0),
+        "test_precision": precision_score(y_true, y_pred, zero_division=0)
+    }
+
+
+class TestBinaryMetrics:
+    """Tests that the single-pass metrics match sklearn."""
+    
+    @pytest.mark.parametrize("seed", [0, 1, 2])
+    def test_random_labels_match_sklearn(self, seed):
+        """Test confusion matrix and metrics on random labels against sklearn."""
+        rng = np.random.default_rng(seed)
+        y_true = rng.integers(0, 2, 500)
+        y_pred = rng.integers(0, 2, 500).astype(np.int8)
+        
+        cm = binary_confusion_matrix(y_true, y_pred)
+        
+        np.testing.assert_array_equal(cm, confusion_matrix(y_true, y_pred, labels=[0, 1]))
+        assert binary_metrics(cm) == pytest.approx(_sklearn_metrics(y_true, y_pred))
+    
+    @pytest.mark.parametrize("y_true, y_pred", [
+        ([0, 0, 0, 0], [0, 0, 0, 0]),  # all negative
+        ([1, 1, 1, 1], [1, 1, 1, 1]),  # all positive
+        ([0, 0, 0, 0], [1, 1, 0, 1]),  # no actual failures
+        ([1, 1, 1, 1], [0, 0, 0, 0]),  # no predicted failures
+    ])
+    def test_degenerate_labels_match_sklearn(self, y_true, y_pred):
+        """Test the single-class cases, where precision/recall may be undefined."""
+        cm = binary_confusion_matrix(y_true, y_pred)
+        
+        np.testing.assert_array_equal(cm, confusion_matrix(y_true, y_pred, labels=[0, 1]))
+        assert binary_metrics(cm) == pytest.approx(_sklearn_metrics(y_true, y_pred))
+
+
+class TestDMatrixCache:
+    """Tests for the on-disk cache of the engineered test DMatrix."""
+    
+    def test_cache_path_depends_on_feature_code_version(self, tmp_path):
+        """Test that bumping DMATRIX_CACHE_VERSION points at a new cache entry."""
+        data_file = tmp_path / "test.parquet"
+        data_file.write_bytes(b"data")
+        
+        cache_dir = str(tmp_path / "cache")
+        
+        current = dmatrix_cache_path(cache_dir, str(data_file))
+        with patch.object(evaluation_pipeline, "DMATRIX_CACHE_VERSION", -1):
+            older = dmatrix_cache_path(cache_dir, str(data_file))
+        
+        assert current != older
+        assert current == dmatrix_cache_path(cache_dir, str(data_file))
+        assert os.path.dirname(current) == cache_dir
+    
+    def test_rebuild_removes_stale_cache_files(self, tmp_path):
+        """Test that writing a new cache entry deletes the older ones in its own directory only."""
+        outside = tmp_path / f"{DMATRIX_CACHE_PREFIX}outside.buffer"
+        outside.write_bytes(b"keep")
+        # The cache directory is created on the first write
+        cache_dir = tmp_path / "cache"
+        cache_path = str(cache_dir / f"{DMATRIX_CACHE_PREFIX}new.buffer")
+        
+        def build():
+            return xgb.DMatrix(np.ones((3, 2), dtype=np.float32), feature_names=["a", "b"])
+        
+        get_cached_dmatrix(str(cache_dir / f"{DMATRIX_CACHE_PREFIX}old.buffer"), build)
+        unrelated = cache_dir / "other.buffer"
+        unrelated.write_bytes(b"keep")
+        
+        dmat = get_cached_dmatrix(cache_path, build)
+        
+        assert dmat.num_row() == 3
+        assert sorted(p.name for p in cache_dir.iterdir()) == ["other.buffer", f"{DMATRIX_CACHE_PREFIX}new.buffer"]
+        assert outside.exists()
+        # The entry just written is reused on the next call
+        assert get_cached_dmatrix(cache_path, lambda: None).feature_names == ["a", "b"]
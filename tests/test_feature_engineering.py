@@ -1,9 +1,20 @@
+import sys
 import pytest
 import pandas as pd
 import numpy as np
 from src.features.feature_engineering import FeatureEngineer
 
 
+@pytest.fixture(scope="module")
+def engineer():
+    """
+    FeatureEngineer shared by the module's tests. transform() only records
+    feature_names_ on its instance, so tests that check that state (or rely
+    on it matching the full feature set) build their own engineer.
+    """
+    return FeatureEngineer()
+
+
 class TestFeatureEngineer:
     """Test suite for FeatureEngineer class."""
     
@@ -13,9 +24,8 @@ class TestFeatureEngineer:
         result = engineer.fit(sample_feature_input)
         assert result is engineer
     
-    def test_transform_creates_physics_features(self, sample_feature_input):
+    def test_transform_creates_physics_features(self, engineer, sample_feature_input):
         """Test that transform creates all expected physics-based features."""
-        engineer = FeatureEngineer()
         result = engineer.transform(sample_feature_input)
         
         # Check that new features are created
@@ -23,7 +33,13 @@ class TestFeatureEngineer:
         assert 'power_factor' in result.columns
         assert 'strain_wear_product' in result.columns
     
-    def test_temp_difference_calculation(self):
+    def test_numeric_features_are_float32(self, engineer, sample_feature_input):
+        """Test that all engineered numeric columns are emitted as float32."""
+        result = engineer.transform(sample_feature_input)
+        
+        assert all(dtype == np.float32 for dtype in result.drop(columns='type').dtypes)
+    
+    def test_temp_difference_calculation(self, engineer):
         """Test temperature difference calculation."""
         df = pd.DataFrame({
             'air_temperature': [300.0, 295.0],
@@ -34,14 +50,13 @@ class TestFeatureEngineer:
             'type': ['L', 'M']
         })
         
-        engineer = FeatureEngineer()
         result = engineer.transform(df)
         
         # temp_difference = process_temperature - air_temperature
         expected = [10.0, 10.0]
-        assert result['temp_difference'].tolist() == expected
+        assert np.array_equal(result['temp_difference'].to_numpy(), expected)
     
-    def test_power_factor_calculation(self):
+    def test_power_factor_calculation(self, engineer):
         """Test power factor calculation."""
         df = pd.DataFrame({
             'air_temperature': [300.0],
@@ -52,14 +67,13 @@ class TestFeatureEngineer:
             'type': ['L']
         })
         
-        engineer = FeatureEngineer()
         result = engineer.transform(df)
         
         # power_factor = torque * rotational_speed
         expected_power = 40.0 * 1500
-        assert result['power_factor'].iloc[0] == expected_power
+        assert result['power_factor'].to_numpy()[0] == expected_power
     
-    def test_strain_wear_product_calculation(self):
+    def test_strain_wear_product_calculation(self, engineer):
         """Test strain wear product calculation."""
         df = pd.DataFrame({
             'air_temperature': [300.0],
@@ -70,14 +84,13 @@ class TestFeatureEngineer:
             'type': ['H']
         })
         
-        engineer = FeatureEngineer()
         result = engineer.transform(df)
         
         # strain_wear_product = torque * tool_wear
         expected_strain = 50.0 * 100
-        assert result['strain_wear_product'].iloc[0] == expected_strain
+        assert result['strain_wear_product'].to_numpy()[0] == expected_strain
     
-    def test_type_encoding(self):
+    def test_type_encoding(self, engineer):
         """Test categorical encoding of type column."""
         df = pd.DataFrame({
             'air_temperature': [300.0, 300.0, 300.0],
@@ -88,14 +101,13 @@ class TestFeatureEngineer:
             'type': ['L', 'M', 'H']
         })
         
-        engineer = FeatureEngineer()
         result = engineer.transform(df)
         
         # L=0, M=1, H=2
-        assert result['type'].tolist() == [0, 1, 2]
+        assert np.array_equal(result['type'].to_numpy(), [0, 1, 2])
         assert result['type'].dtype in [np.int64, np.int32, int]
     
-    def test_unknown_type_handling(self):
+    def test_unknown_type_handling(self, engineer):
         """Test handling of unknown type values."""
         df = pd.DataFrame({
             'air_temperature': [300.0],
@@ -106,36 +118,33 @@ class TestFeatureEngineer:
             'type': ['X']  # Unknown type
         })
         
-        engineer = FeatureEngineer()
         result = engineer.transform(df)
         
         # Unknown types should default to 1 (Medium)
-        assert result['type'].iloc[0] == 1
+        assert result['type'].to_numpy()[0] == 1
     
-    def test_missing_columns_warning(self, caplog):
+    def test_missing_columns_warning(self, engineer, caplog):
         """Test that missing columns trigger warnings."""
         df = pd.DataFrame({
             'rotational_speed': [1500],
             'type': ['L']
         })
         
-        engineer = FeatureEngineer()
         result = engineer.transform(df)
         
         # Should have warnings for missing columns
         assert 'temp_difference' not in result.columns
         assert 'power_factor' not in result.columns
     
-    def test_transform_preserves_original_columns(self, sample_feature_input):
+    def test_transform_preserves_original_columns(self, engineer, sample_feature_input):
         """Test that original columns are preserved."""
-        engineer = FeatureEngineer()
         result = engineer.transform(sample_feature_input)
         
         # Original columns should still be present
         for col in sample_feature_input.columns:
             assert col in result.columns
     
-    def test_transform_with_zeros(self):
+    def test_transform_with_zeros(self, engineer):
         """Test handling of zero values in calculations."""
         df = pd.DataFrame({
             'air_temperature': [300.0],
@@ -146,33 +155,130 @@ class TestFeatureEngineer:
             'type': ['L']
         })
         
-        engineer = FeatureEngineer()
         result = engineer.transform(df)
         
         # Should handle zeros without errors
-        assert result['power_factor'].iloc[0] == 0.0
-        assert result['strain_wear_product'].iloc[0] == 0.0
+        assert result['power_factor'].to_numpy()[0] == 0.0
+        assert result['strain_wear_product'].to_numpy()[0] == 0.0
+    
+    def test_transform_nullable_columns_with_missing_values(self, engineer):
+        """Test that pd.NA in nullable integer columns becomes NaN instead of raising."""
+        df = pd.DataFrame({
+            'air_temperature': [300.0, 301.0],
+            'process_temperature': [310.0, 311.0],
+            'rotational_speed': pd.array([1500, pd.NA], dtype='Int64'),
+            'torque': [40.0, 42.0],
+            'tool_wear': pd.array([100, 120], dtype='Int64'),
+            'type': ['L', 'M']
+        })
+        
+        result = engineer.transform(df)
+        
+        assert result['power_factor'].to_numpy()[0] == 40.0 * 1500
+        assert np.isnan(result['power_factor'].to_numpy()[1])
+        assert np.isnan(result['rotational_speed'].to_numpy()[1])
+        assert result['strain_wear_product'].to_numpy()[1] == 42.0 * 120
     
-    def test_transform_returns_dataframe(self, sample_feature_input):
+    def test_transform_returns_dataframe(self, engineer, sample_feature_input):
         """Test that transform returns a DataFrame."""
-        engineer = FeatureEngineer()
         result = engineer.transform(sample_feature_input)
         
         assert isinstance(result, pd.DataFrame)
     
-    def test_transform_raises_on_non_dataframe(self):
+    def test_transform_raises_on_non_dataframe(self, engineer):
         """Test that transform raises TypeError for non-DataFrame input."""
-        engineer = FeatureEngineer()
         
         with pytest.raises(TypeError):
             engineer.transform([[1, 2, 3]])
     
-    def test_fit_transform(self, sample_feature_input):
+    def test_fit_transform(self, engineer, sample_feature_input):
         """Test fit_transform method (inherited from BaseEstimator)."""
-        engineer = FeatureEngineer()
         result = engineer.fit_transform(sample_feature_input)
         
         # Should have all engineered features
         assert 'temp_difference' in result.columns
         assert 'power_factor' in result.columns
         assert 'strain_wear_product' in result.columns
+    
+    def test_feature_names_stored_as_interned_tuple(self, sample_feature_input):
+        """Test that feature_names_ is a tuple of interned strings set on first transform."""
+        engineer = FeatureEngineer()
+        result = engineer.fit_transform(sample_feature_input)
+        
+        assert isinstance(engineer.feature_names_, tuple)
+        assert engineer.feature_names_ == tuple(result.columns)
+        assert all(name is sys.intern(name) for name in engineer.feature_names_)
+    
+    def test_transform_row_matches_transform(self, sample_feature_input):
+        """Test that the single-row fast path matches the DataFrame transform."""
+        engineer = FeatureEngineer()
+        expected = engineer.transform(sample_feature_input).to_numpy(dtype=np.float32)
+        
+        for i, row in enumerate(sample_feature_input.to_dict(orient='records')):
+            result = engineer.transform_row(row)
+            
+            assert result.dtype == np.float32
+            assert result.shape == (len(engineer.feature_names_),)
+            np.testing.assert_array_equal(result, expected[i])
+    
+    def test_transform_rows_matches_transform(self, sample_feature_input):
+        """Test that the batch fast path matches the DataFrame transform."""
+        engineer = FeatureEngineer()
+        expected = engineer.transform(sample_feature_input).to_numpy(dtype=np.float32)
+        
+        result = engineer.transform_rows(sample_feature_input.to_dict(orient='records'))
+        
+        assert result.dtype == np.float32
+        np.testing.assert_array_equal(result, expected)
+        assert engineer.transform_rows([]).shape == (0, len(engineer.feature_names_))
+    
+    def test_transform_row_unknown_type(self, engineer):
+        """Test that the single-row fast path defaults unknown types to Medium."""
+        row = {
+            'air_temperature': 300.0,
+            'process_temperature': 310.0,
+            'rotational_speed': 1500,
+            'torque': 40.0,
+            'tool_wear': 10,
+            'type': 'X'
+        }
+        
+        result = engineer.transform_row(row)
+        
+        assert result[0] == 1
+        assert result[6] == 10.0
+    
+    def test_transform_does_not_modify_input(self, engineer, sample_feature_input):
+        """Test that transform leaves the input DataFrame untouched by default."""
+        original = sample_feature_input.copy()
+        engineer.transform(sample_feature_input)
+        
+        pd.testing.assert_frame_equal(sample_feature_input, original)
+    
+    def test_transform_copy_argument_is_ignored(self, engineer, sample_feature_input):
+        """Test that copy=False is still accepted and leaves the input untouched."""
+        original = sample_feature_input.copy()
+        result = engineer.transform(sample_feature_input, copy=False)
+        
+        pd.testing.assert_frame_equal(sample_feature_input, original)
+        pd.testing.assert_frame_equal(result, engineer.transform(sample_feature_input))
+    
+    def test_large_batch_matches_small_batch_path(self, engineer):
+        """Test that large batches (Numba kernel when installed) match the NumPy path."""
+        from src.features.feature_engineering import NUMBA_MIN_ROWS
+        
+        rng = np.random.default_rng(42)
+        n = NUMBA_MIN_ROWS + 1
+        df = pd.DataFrame({
+            'type': rng.choice(['L', 'M', 'H'], n),
+            'air_temperature': rng.normal(300.0, 2.0, n).round(1),
+            'process_temperature': rng.normal(310.0, 1.5, n).round(1),
+            'rotational_speed': rng.integers(1100, 2900, n),
+            'torque': rng.normal(40.0, 10.0, n).round(1),
+            'tool_wear': rng.integers(0, 250, n)
+        })
+        
+        large = engineer.transform(df)
+        small = pd.concat([engineer.transform(df.iloc[:n // 2]), engineer.transform(df.iloc[n // 2:])])
+        
+        pd.testing.assert_frame_equal(large, small)
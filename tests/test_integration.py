@@ -1,8 +1,7 @@
 import pytest
+import numpy as np
 import pandas as pd
-import pickle
 import os
-from pathlib import Path
 from unittest.mock import patch, MagicMock
 from src.features.feature_engineering import FeatureEngineer
 
@@ -11,20 +10,9 @@ class TestEndToEndPrediction:
     """Integration tests for the complete prediction pipeline."""
     
     @pytest.fixture
-    def real_models(self):
-        """Load real models if they exist, otherwise skip."""
-        model_path = Path("models/xgboost_model.pkl")
-        engineer_path = Path("models/feature_engineer.pkl")
-        
-        if not model_path.exists() or not engineer_path.exists():
-            pytest.skip("Models not found. Run training pipeline first.")
-        
-        with open(model_path, "rb") as f:
-            model = pickle.load(f)
-        
-        with open(engineer_path, "rb") as f:
-            engineer = pickle.load(f)
-        
+    def real_models(self, real_artifacts):
+        """Real models (loaded once per session), skipped if they don't exist."""
+        model, engineer = real_artifacts
         return {"model": model, "engineer": engineer}
     
     def test_feature_engineering_plus_prediction(self, real_models):
@@ -52,8 +40,8 @@ class TestEndToEndPrediction:
         assert len(predictions) == 3
         assert predictions.shape == (3,)
         assert probabilities.shape == (3, 2)
-        assert all(p in [0, 1] for p in predictions)
-        assert all(0 <= prob <= 1 for prob in probabilities.flatten())
+        assert np.isin(predictions, [0, 1]).all()
+        assert ((probabilities >= 0) & (probabilities <= 1)).all()
     
     def test_single_sample_prediction(self, real_models):
         """Test prediction on a single sample."""
@@ -127,11 +115,8 @@ class TestEndToEndPrediction:
 class TestAPIIntegration:
     """Integration tests for API with real models."""
     
-    def test_api_with_mocked_models(self, sample_feature_input):
+    def test_api_with_mocked_models(self, api_client, sample_feature_input):
         """Test API endpoint with mocked models."""
-        from fastapi.testclient import TestClient
-        from api.main import app
-        
         mock_engineer = FeatureEngineer()
         mock_model = MagicMock()
         mock_model.predict.return_value = [0]
@@ -143,8 +128,6 @@ class TestAPIIntegration:
         }
         
         with patch('api.main.models', models_dict):
-            client = TestClient(app)
-            
             payload = {
                 "air_temperature": 300.0,
                 "process_temperature": 310.0,
@@ -154,7 +137,7 @@ class TestAPIIntegration:
                 "type": "M"
             }
             
-            response = client.post("/predict", json=payload)
+            response = api_client.post("/predict", json=payload)
             
             assert response.status_code == 200
             data = response.json()
@@ -189,7 +172,25 @@ class TestDataPipeline:
         assert 'temp_difference' in df_engineered.columns
         assert 'power_factor' in df_engineered.columns
         assert 'strain_wear_product' in df_engineered.columns
-
-
-# Import numpy for type checking
-import numpy as np
+    
+    def test_polars_clean_columns_to_feature_engineering(self, tmp_path, sample_raw_data):
+        """Test that the lazy Polars path yields the same engineered features as pandas."""
+        pl = pytest.importorskip("polars")
+        from src.data.preprocessing import clean_column_names, pl_clean_column_names
+        from src.features.feature_engineering import FEATURE_COLS
+        
+        raw_csv = tmp_path / "raw.csv"
+        sample_raw_data.to_csv(raw_csv, index=False)
+        
+        # Scan, rename and project lazily; the CSV is read once, on collect()
+        df_features = (
+            pl_clean_column_names(pl.scan_csv(raw_csv))
+            .select(FEATURE_COLS)
+            .collect()
+            .to_pandas()
+        )
+        expected = clean_column_names(sample_raw_data)[FEATURE_COLS]
+        
+        pd.testing.assert_frame_equal(
+            FeatureEngineer().transform(df_features), FeatureEngineer().transform(expected)
+        )
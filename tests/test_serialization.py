@@ -0,0 +1,75 @@
+import pickle
+import pytest
+import numpy as np
+import pandas as pd
+from src.features.feature_engineering import FeatureEngineer
+from src.utils.serialization import save_artifact, load_artifact, buffers_path
+
+
+class TestArtifactSerialization:
+    """Tests for protocol 5 artifact persistence."""
+    
+    def test_round_trip_with_out_of_band_buffers(self, tmp_path):
+        """Test that numpy buffers are written to the sidecar and restored."""
+        path = str(tmp_path / "artifact.pkl")
+        obj = {"weights": np.arange(1000, dtype=np.float64), "name": "model"}
+        
+        save_artifact(obj, path)
+        loaded = load_artifact(path)
+        
+        # The array data lives in the sidecar, not in the pickle stream
+        assert (tmp_path / "artifact.buffers").stat().st_size > obj["weights"].nbytes
+        assert (tmp_path / "artifact.pkl").stat().st_size < obj["weights"].nbytes
+        assert loaded["name"] == "model"
+        np.testing.assert_array_equal(loaded["weights"], obj["weights"])
+        assert loaded["weights"].flags.writeable
+    
+    def test_round_trip_feature_engineer(self, tmp_path, sample_feature_input):
+        """Test that a fitted FeatureEngineer survives save/load."""
+        path = str(tmp_path / "feature_engineer.pkl")
+        engineer = FeatureEngineer()
+        expected = engineer.fit_transform(sample_feature_input)
+        
+        save_artifact(engineer, path)
+        loaded = load_artifact(path)
+        
+        assert loaded.feature_names_ == engineer.feature_names_
+        pd.testing.assert_frame_equal(loaded.transform(sample_feature_input), expected)
+    
+    def test_loads_plain_pickle_without_sidecar(self, tmp_path):
+        """Test backward compatibility with artifacts written by pickle.dump()."""
+        path = str(tmp_path / "legacy.pkl")
+        with open(path, "wb") as f:
+            pickle.dump({"a": [1, 2, 3]}, f)
+        
+        assert load_artifact(path) == {"a": [1, 2, 3]}
+    
+    def test_buffers_path_replaces_extension(self):
+        """Test that the sidecar sits next to the pickle."""
+        assert buffers_path("models/xgboost_model.pkl") == "models/xgboost_model.buffers"
+    
+    def test_xgboost_model_round_trip(self, tmp_path):
+        """Test that a model saved in UBJ format loads with the same predictions."""
+        import xgboost as xgb
+        from src.utils.serialization import load_xgboost_model
+        
+        rng = np.random.default_rng(0)
+        X = rng.normal(size=(200, 3)).astype(np.float32)
+        y = (X[:, 0] > 0).astype(int)
+        model = xgb.XGBClassifier(n_estimators=5, max_depth=2)
+        model.fit(X, y)
+        model.get_booster().set_attr(decision_threshold="0.3")
+        
+        path = str(tmp_path / "model.ubj")
+        model.save_model(path)
+        loaded = load_xgboost_model(path)
+        
+        np.testing.assert_allclose(loaded.predict_proba(X), model.predict_proba(X))
+        assert loaded.get_booster().attr("decision_threshold") == "0.3"
+    
+    def test_missing_xgboost_model_raises_file_not_found(self, tmp_path):
+        """Test that a missing model file surfaces as FileNotFoundError."""
+        from src.utils.serialization import load_xgboost_model
+        
+        with pytest.raises(FileNotFoundError):
+            load_xgboost_model(str(tmp_path / "missing.ubj"))
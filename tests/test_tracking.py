@@ -0,0 +1,31 @@
+import sys
+from unittest.mock import patch, MagicMock
+from src.utils.tracking import mlflow_enabled, mlflow_call, start_run
+
+
+class TestMlflowTracking:
+    """Tests for the MLflow on/off switch."""
+    
+    def test_disabled_by_test_suite(self):
+        """Test that conftest turns tracking off."""
+        assert not mlflow_enabled()
+    
+    def test_disabled_calls_are_no_ops(self):
+        """Test that disabled tracking neither imports nor calls mlflow."""
+        with patch.dict(sys.modules, {"mlflow": None}):
+            assert mlflow_call("log_metrics", {"test_f1": 1.0}) is None
+            with start_run("pipeline_training"):
+                pass
+    
+    def test_enabled_calls_forward_to_mlflow(self, monkeypatch):
+        """Test that enabled tracking resolves dotted names on the mlflow package."""
+        monkeypatch.delenv("MLFLOW_DISABLED")
+        fake_mlflow = MagicMock()
+        fake_xgboost = MagicMock()
+        
+        with patch.dict(sys.modules, {"mlflow": fake_mlflow, "mlflow.xgboost": fake_xgboost}):
+            mlflow_call("log_metrics", {"test_f1": 1.0})
+            mlflow_call("xgboost.log_model", "model", "model")
+        
+        fake_mlflow.log_metrics.assert_called_once_with({"test_f1": 1.0})
+        fake_xgboost.log_model.assert_called_once_with("model", "model")